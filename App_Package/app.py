@@ -1,13 +1,24 @@
+import csv
+import io
+import json
 import os
-import pickle
+import threading
 
 from fastapi import BackgroundTasks, Depends, FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from crontab import CronTab
+from InstaDataPackage import Instabot, Storage
+from InstaDataPackage.Bot_Predictor import Bot_Predictor
+from InstaDataPackage.Instabase import DB_Session_Local
+from InstaDataPackage.Scheduler import Scheduler
+from InstaDataPackage.State_Store import STATE_URL, State_Store, state_version
+from .auth import AuthError, authorize, hash_password, is_hashed, tokens, verify_password
 from .database import SessionLocal, engine
 from .models import Account, User, Base
 
@@ -16,6 +27,62 @@ from .models import Account, User, Base
 app = FastAPI()
 
 Base.metadata.create_all(bind=engine)
+# Tables created before accounts were scored are missing the column
+with DB_Session_Local() as db:
+    db.create_score()
+
+
+class StatusCache:
+    """Keeps the last status built so polling it does not load the bot, the status is rebuilt
+    once the state file has changed or the cache has been invalidated
+    """
+
+    def __init__(self, url=STATE_URL):
+        """
+        Args:
+            url (str, optional): The url of the state database. Defaults to STATE_URL.
+        """
+        self.__url = url
+        self.__lock = threading.Lock()
+        self.__generation = 0
+        self.__entry = (None, None)
+
+    def invalidate(self) -> None:
+        # Called from the scheduler thread and the request handlers at once
+        with self.__lock:
+            self.__generation += 1
+
+    def get(self, build) -> dict:
+        """Returns the cached status, built again with build when it is out of date
+
+        Args:
+            build (Callable[[], dict]): Builds the status
+
+        Returns:
+            dict: The status, shared between callers so it must not be changed
+        """
+        key = (self.__generation, state_version(self.__url))
+        cached_key, status = self.__entry
+        if cached_key == key:
+            return status
+        with self.__lock:
+            cached_key, status = self.__entry
+            if cached_key != key:
+                status = build()
+                self.__entry = (key, status)
+        return status
+
+
+status_cache = StatusCache()
+
+# "daemon" keeps the bot resident in this process, "cron" runs cronjob.py every 5 minutes
+SCRAPE_MODE = os.environ.get("SCRAPE_MODE", "daemon")
+scheduler = Scheduler(
+    Instabot.load_bot,
+    interval=int(os.environ.get("SCRAPE_INTERVAL", 300)),
+    on_pass=status_cache.invalidate,
+    store=State_Store(),
+)
 
 
 class SignIn(BaseModel):
@@ -28,6 +95,12 @@ class CreateUser(BaseModel):
     password: str
 
 
+class Predict(BaseModel):
+    usernames: list[str] = []
+    # posts, followers, following, private, bio_tag, external_url and verified of each account
+    rows: list[list[float]] = []
+
+
 def get_db():
     try:
         db = SessionLocal()
@@ -38,21 +111,130 @@ def get_db():
 
 templates = Jinja2Templates(directory="templates")
 
+ACCOUNT_COLUMNS = [column.name for column in Account.__table__.columns]
+# Most accounts returned in one page
+PAGE_LIMIT = 1000
+# Most usernames and rows scored in one request
+PREDICT_LIMIT = 10000
+
+# Maps the model saved by the scraper once, the scrapes save it in a new file it maps again
+predictor = Bot_Predictor(store=Instabot.store())
+
+
+def account_page(db: Session, after: str = None, limit: int = 100) -> tuple:
+    """Returns the accounts following the given username in username order, seeking on the
+    primary key so a page costs the same wherever it is in the table
+
+    Args:
+        db (Session): The database session
+        after (str, optional): The last username of the previous page. Defaults to None.
+        limit (int, optional): The amount of accounts in the page. Defaults to 100.
+
+    Returns:
+        tuple: The accounts and the username to request the next page after, None on the last page
+    """
+    query = db.query(Account)
+    if after is not None:
+        query = query.filter(Account.username > after)
+    limit = max(1, min(limit, PAGE_LIMIT))
+    accounts = query.order_by(Account.username).limit(limit).all()
+    after = accounts[-1].username if len(accounts) == limit else None
+    return accounts, after
+
 
 @app.get("/")
-def home(request: Request, db: Session = Depends(get_db)):
-    accounts = db.query(Account)
+def home(request: Request, after: str = None, db: Session = Depends(get_db)):
+    accounts, next_after = account_page(db, after)
+    status = get_status()
     return templates.TemplateResponse(
         "home.html",
         {
             "request": request,
             "accounts": accounts,
-            "count": accounts.count(),
-            "status": get_status(),
+            "next": next_after,
+            # Counted once per scraping pass with the status rather than on every page view
+            "count": status["entries"],
+            "status": status,
         },
     )
 
 
+@app.get("/accounts")
+def accounts(
+    after: str = None,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    username: str = Depends(authorize),
+):
+    page, next_after = account_page(db, after, limit)
+    return {
+        "code": "success",
+        "accounts": [
+            {column: getattr(account, column) for column in ACCOUNT_COLUMNS}
+            for account in page
+        ],
+        "next": next_after,
+    }
+
+
+def stream_accounts(fmt: str, chunk_size: int = 1000):
+    """Yields the accounts table as csv or ndjson text, the rows are read from a server side
+    cursor one chunk at a time so memory stays bounded whatever the size of the table
+
+    Args:
+        fmt (str): csv or ndjson
+        chunk_size (int, optional): The amount of rows fetched at a time. Defaults to 1000.
+    """
+    with engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, yield_per=chunk_size
+        ).execute(select(Account.__table__).order_by(Account.username))
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(ACCOUNT_COLUMNS)
+            for rows in result.partitions():
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(ACCOUNT_COLUMNS, row))) + "\n" for row in rows
+                )
+
+
+@app.get("/accounts/export")
+def export_accounts(fmt: str = "csv", username: str = Depends(authorize)):
+    if fmt not in ("csv", "ndjson"):
+        return {"code": "failed", "message": "format has to be csv or ndjson"}
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_accounts(fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=accounts.{fmt}"},
+    )
+
+
+@app.post("/predict")
+def predict(request: Predict, username: str = Depends(authorize)):
+    if len(request.usernames) + len(request.rows) > PREDICT_LIMIT:
+        return {"code": "failed", "message": f"at most {PREDICT_LIMIT} accounts per request"}
+    if any(len(row) != 7 for row in request.rows):
+        return {"code": "failed", "message": "rows have to hold 7 features"}
+    if predictor.model() is None:
+        return {"code": "failed", "message": "no model has been saved yet"}
+    scores, missing = predictor.predict_users(request.usernames)
+    return {
+        "code": "success",
+        "scores": scores,
+        "missing": missing,
+        "rows": predictor.predict_rows(request.rows),
+    }
+
+
 @app.post("/add_user")
 async def add_user(
     create_user: CreateUser,
@@ -61,7 +243,7 @@ async def add_user(
 ):
     user = User()
     user.username = create_user.username
-    user.password = create_user.password
+    user.password = hash_password(create_user.password)
     try:
         db.add(user)
         db.commit()
@@ -75,107 +257,141 @@ def create_cronjob():
     with CronTab(user=os.environ.get("user")) as cron:
         job = cron.new(command="python3 cronjob.py", comment="Scrape")
         job.minute.every(5)
+    status_cache.invalidate()
 
 
 def get_status(context=None):
-    with open("bot.pickle", "rb") as fv:
-        bot = pickle.load(fv)
-    running = False
-    cron = CronTab(user=os.environ.get("user"))
-    for _ in cron:
-        running = True
+    d = status_cache.get(build_status)
+    if context:
+        context.update(d)
+        return context
+    return d
+
+
+def build_status():
+    if SCRAPE_MODE == "cron":
+        bot = Instabot.load_bot()
+        running = False
+        cron = CronTab(user=os.environ.get("user"))
+        for _ in cron:
+            running = True
+    else:
+        bot = scheduler.bot
+        running = scheduler.is_running()
     d = {
         "cooldown": bot.cooldown,
         "date_stamp": bot.date_stamp,
-        "current_user": bot.users.peek(),
+        "current_user": bot.schedule.peek(),
         "running": running,
         "stop_date": bot.stop_date,
+        "paused": scheduler.is_paused(),
     }
-    if context:
-        context.update(d)
-        return context
+    db = SessionLocal()
+    try:
+        d["entries"] = db.query(Account).count()
+    finally:
+        db.close()
     return d
 
 
 def stop_cronjob():
     with CronTab(user=os.environ.get("user")) as cron:
         cron.remove_all(comment="Scrape")
+    status_cache.invalidate()
 
 
 def start_up():
-    stop_cronjob()
-    with open("bot.pickle", "rb") as fv:
-        bot = pickle.load(fv)
-    bot.add_users()
-    create_cronjob()
+    if SCRAPE_MODE == "cron":
+        stop_cronjob()
+        bot = Instabot.load_bot()
+        bot.add_users()
+        create_cronjob()
+    else:
+        # Restarted right after, so a crash while syncing still restores it
+        scheduler.stop(save=False)
+        scheduler.bot.add_users()
+        scheduler.start()
+        status_cache.invalidate()
+
+
+def stop_scraping():
+    if SCRAPE_MODE == "cron":
+        stop_cronjob()
+    else:
+        scheduler.stop()
+        status_cache.invalidate()
+
+
+@app.on_event("startup")
+def restore_scraping():
+    # A scheduler running when the API last exited carries on
+    if SCRAPE_MODE == "daemon" and scheduler.restore():
+        status_cache.invalidate()
+
+
+@app.on_event("shutdown")
+def shut_down():
+    # Exiting does not count as stopping, the next process restores the scheduler
+    scheduler.stop(save=False)
+    Storage.dispose()
+
+
+@app.exception_handler(AuthError)
+async def auth_error(request: Request, err: AuthError):
+    return JSONResponse(status_code=401, content={"code": "failed", "message": str(err)})
+
+
+# Not async so the password hash and the query run in the thread pool, off the event loop
+@app.post("/login")
+def login(signin_request: SignIn, db: Session = Depends(get_db)):
+    user = db.query(User).filter(User.username == signin_request.username).first()
+    if user and verify_password(signin_request.password, user.password):
+        # Passwords saved in plaintext by older versions are hashed on their next login
+        if not is_hashed(user.password):
+            user.password = hash_password(signin_request.password)
+            db.commit()
+        return {"code": "success", "token": tokens.issue(user.username)}
+    return {"code": "failed", "message": "incorrect username or password"}
 
 
 @app.post("/run")
-async def run_cron(
-    signin_request: SignIn,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-):
-    users = db.query(User)
-    user = (
-        users.filter(User.username == signin_request.username)
-        .filter(User.password == signin_request.password)
-        .first()
-    )
-    if user:
-        background_tasks.add_task(start_up)
-        return {"code": "success"}
-    return {"code": "failed"}
+async def run_cron(background_tasks: BackgroundTasks, username: str = Depends(authorize)):
+    background_tasks.add_task(start_up)
+    return {"code": "success"}
 
 
 @app.post("/status")
-async def status(
-    signin_request: SignIn,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-):
-    users = db.query(User)
-    user = (
-        users.filter(User.username == signin_request.username)
-        .filter(User.password == signin_request.password)
-        .first()
-    )
-    if user:
-        return get_status({"code": "success"})
-
-    return {"code": "failed", "message": "incorrect username or password"}
+async def status(username: str = Depends(authorize)):
+    return get_status({"code": "success"})
 
 
 @app.post("/stop")
-async def stop_cron(
-    signin_request: SignIn,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-):
-    users = db.query(User)
-    user = (
-        users.filter(User.username == signin_request.username)
-        .filter(User.password == signin_request.password)
-        .first()
-    )
-    if user:
-        background_tasks.add_task(stop_cronjob)
-        return {"code": "success"}
-    return {"code": "failed"}
+async def stop_cron(background_tasks: BackgroundTasks, username: str = Depends(authorize)):
+    background_tasks.add_task(stop_scraping)
+    return {"code": "success"}
+
+
+@app.post("/pause")
+async def pause(username: str = Depends(authorize)):
+    scheduler.pause()
+    status_cache.invalidate()
+    return {"code": "success"}
+
+
+@app.post("/resume")
+async def resume(username: str = Depends(authorize)):
+    scheduler.resume()
+    status_cache.invalidate()
+    return {"code": "success"}
 
 
 @app.post("/stats")
-async def stats(
-    signin_request: SignIn,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-):
-    users = db.query(User)
-    user = (
-        users.filter(User.username == signin_request.username)
-        .filter(User.password == signin_request.password)
-        .first()
-    )
-    if user:
-        return {"code": "success", "entries": db.query(Account).count()}
-    return {"code": "failed"}
+async def stats(db: Session = Depends(get_db), username: str = Depends(authorize)):
+    return {
+        "code": "success",
+        "entries": db.query(Account).count(),
+        "pools": Storage.pool_stats(),
+        "features": Instabot.features().stats(),
+        "predictions": predictor.stats(),
+        "store": Instabot.store().stats(),
+    }
@@ -0,0 +1,143 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+
+from fastapi import Header
+
+# Tokens signed with a random key stop working when the process restarts
+SECRET_KEY = os.environ.get("SECRET_KEY", "").encode() or secrets.token_bytes(32)
+TOKEN_TTL = int(os.environ.get("TOKEN_TTL", 3600))
+_ITERATIONS = 200_000
+
+
+class AuthError(Exception):
+    """Raised when a request has no valid token"""
+
+
+def hash_password(password: str) -> str:
+    """Hashes the password with PBKDF2 and a random salt
+
+    Args:
+        password (str): The plaintext password
+
+    Returns:
+        str: The algorithm, iterations, salt and hash joined by $
+    """
+    salt = secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), _ITERATIONS)
+    return f"pbkdf2_sha256${_ITERATIONS}${salt}${digest.hex()}"
+
+
+def is_hashed(stored: str) -> bool:
+    return stored.startswith("pbkdf2_sha256$")
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """Checks the password against the stored hash, passwords stored in plaintext by older
+    versions are compared directly
+
+    Args:
+        password (str): The plaintext password given
+        stored (str): The stored hash
+
+    Returns:
+        bool: Whether the password matches
+    """
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode(), stored.encode())
+    _, iterations, salt, digest = stored.split("$")
+    candidate = hashlib.pbkdf2_hmac(
+        "sha256", password.encode(), salt.encode(), int(iterations)
+    )
+    return hmac.compare_digest(candidate.hex(), digest)
+
+
+class TokenCache:
+    """Keeps the tokens issued or verified in memory until they expire, so a request with a
+    known token is authorized without recomputing its signature or reading the database
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__tokens = {}
+
+    def issue(self, username: str, ttl: int = TOKEN_TTL) -> str:
+        """Signs a token for the user that expires after the ttl
+
+        Args:
+            username (str): The user the token is for
+            ttl (int, optional): Seconds the token is valid for. Defaults to TOKEN_TTL.
+
+        Returns:
+            str: The signed token
+        """
+        expires = int(time.time()) + ttl
+        payload = base64.urlsafe_b64encode(f"{username}:{expires}".encode()).decode()
+        token = f"{payload}.{self.__sign(payload)}"
+        self.__add(token, username, expires)
+        return token
+
+    def verify(self, token: str):
+        """Returns the user of the token if it is valid and has not expired
+
+        Args:
+            token (str): The token given
+
+        Returns:
+            str: The username, None if the token is not valid
+        """
+        now = time.time()
+        entry = self.__tokens.get(token)
+        if entry is not None:
+            return entry[0] if entry[1] > now else None
+        # A token signed before this cache existed, e.g. by another worker
+        try:
+            payload, signature = token.split(".")
+            # Bytes since compare_digest rejects strings that are not ASCII
+            if not hmac.compare_digest(self.__sign(payload).encode(), signature.encode()):
+                return None
+            username, expires = (
+                base64.urlsafe_b64decode(payload.encode()).decode().rsplit(":", 1)
+            )
+            expires = int(expires)
+        except ValueError:
+            return None
+        if expires <= now:
+            return None
+        self.__add(token, username, expires)
+        return username
+
+    def __sign(self, payload: str) -> str:
+        return hmac.new(SECRET_KEY, payload.encode(), hashlib.sha256).hexdigest()
+
+    def __add(self, token: str, username: str, expires: int) -> None:
+        with self.__lock:
+            if len(self.__tokens) >= 1024:
+                now = time.time()
+                self.__tokens = {
+                    k: v for k, v in self.__tokens.items() if v[1] > now
+                }
+            self.__tokens[token] = (username, expires)
+
+
+tokens = TokenCache()
+
+
+def authorize(authorization: str = Header(None)) -> str:
+    """Dependency returning the user of the bearer token of the request
+
+    Raises:
+        AuthError: If the token is missing, not valid or expired
+
+    Returns:
+        str: The username
+    """
+    if authorization and authorization.startswith("Bearer "):
+        username = tokens.verify(authorization[len("Bearer ") :])
+        if username:
+            return username
+    raise AuthError("invalid or expired token")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean
+from sqlalchemy import Column, String, Integer, Boolean, Float
 
 from .database import Base
 
@@ -13,7 +13,7 @@ class User(Base):
 class Account(Base):
     __tablename__ = "accounts"
 
-    # username, posts, followers, following, private, bio_tag, external_url, verified
+    # username, posts, followers, following, private, bio_tag, external_url, verified, bot_score
     username = Column(String, primary_key=True, index=True)
     posts = Column(Integer)
     followers = Column(Integer)
@@ -22,4 +22,6 @@ class Account(Base):
     bio_tag = Column(Boolean)
     external_url = Column(Boolean)
     verified = Column(Boolean)
+    # Bot likelihood given by the scorer when the account was scraped
+    bot_score = Column(Float)
 
@@ -0,0 +1,69 @@
+class Array_List:
+    """Sequence with the interface of Linked_List kept in a Python list, with a count of each
+    value so indexing and membership take constant time
+    """
+
+    __slots__ = ("__values", "__counts")
+
+    def __init__(self, values=()):
+        """
+        Args:
+            values (Iterable, optional): The values to start with. Defaults to ().
+        """
+        self.__values = []
+        self.__counts = {}
+        for value in values:
+            self.append(value)
+
+    def __len__(self) -> int:
+        return len(self.__values)
+
+    def __str__(self) -> str:
+        return "".join(f"{value}-->" for value in self.__values)
+
+    def __getitem__(self, i: int):
+        assert self.__valid_index(i), "Invalid index"
+        return self.__values[i]
+
+    def __setitem__(self, i: int, value):
+        assert self.__valid_index(i), "Invalid Index"
+        self.__discard(self.__values[i])
+        self.__values[i] = value
+        self.__add(value)
+
+    def __contains__(self, key) -> bool:
+        return key in self.__counts
+
+    def __iter__(self):
+        return iter(self.__values)
+
+    def __valid_index(self, index: int) -> bool:
+        return -len(self.__values) <= index < len(self.__values)
+
+    def __add(self, value) -> None:
+        self.__counts[value] = self.__counts.get(value, 0) + 1
+
+    def __discard(self, value) -> None:
+        if self.__counts[value] == 1:
+            del self.__counts[value]
+        else:
+            self.__counts[value] -= 1
+
+    def clear(self) -> None:
+        self.__values.clear()
+        self.__counts.clear()
+
+    def is_empty(self) -> bool:
+        return not self.__values
+
+    def peek(self):
+        """Returns the first value, None if the list is empty"""
+        return self.__values[0] if self.__values else None
+
+    def prepend(self, value) -> None:
+        self.__values.insert(0, value)
+        self.__add(value)
+
+    def append(self, value) -> None:
+        self.__values.append(value)
+        self.__add(value)
@@ -0,0 +1,126 @@
+import hashlib
+import math
+import os
+import struct
+import threading
+
+# Capacity, error rate, hash count, bit count and amount of items added
+_HEADER = struct.Struct("<QdIQQ")
+
+
+class Bloom_Filter:
+    """Set of usernames answering membership in constant time and a fixed amount of memory.
+    A username that was added is always found, one that was not is wrongly found with at most
+    the error rate while no more than the capacity have been added
+    """
+
+    def __init__(self, capacity=1_000_000, error_rate=0.01):
+        """
+        Args:
+            capacity (int, optional): Amount of items the error rate holds for.
+            Defaults to 1_000_000.
+            error_rate (float, optional): Chance of finding an item never added. Defaults to 0.01.
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.count = 0
+        self.__array = bytearray((self.bits + 7) // 8)
+        self.__lock = threading.Lock()
+
+    def __positions(self, item: str):
+        # Double hashing derives every position from the two halves of a single digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = struct.unpack("<QQ", digest)
+        for i in range(self.hashes):
+            yield (first + i * second) % self.bits
+
+    def add(self, item: str) -> bool:
+        """Adds the item to the filter
+
+        Args:
+            item (str): The username
+
+        Returns:
+            bool: False if the item was probably added before
+        """
+        added = False
+        with self.__lock:
+            for position in self.__positions(item):
+                byte, bit = divmod(position, 8)
+                if not self.__array[byte] & (1 << bit):
+                    self.__array[byte] |= 1 << bit
+                    added = True
+            if added:
+                self.count += 1
+        return added
+
+    def update(self, items) -> int:
+        """Adds every item to the filter
+
+        Args:
+            items (Iterable[str]): The usernames
+
+        Returns:
+            int: The amount of items that were not in the filter
+        """
+        return sum(self.add(item) for item in items)
+
+    def __contains__(self, item: str) -> bool:
+        for position in self.__positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.__array[byte] & (1 << bit):
+                return False
+        return True
+
+    def is_full(self) -> bool:
+        return self.count >= self.capacity
+
+    def save(self, filename: str) -> None:
+        """Writes the filter to a temporary file and moves it over the saved one
+
+        Args:
+            filename (str): The file to save to
+        """
+        temp = f"{filename}.tmp"
+        with self.__lock:
+            with open(temp, "wb") as fv:
+                fv.write(
+                    _HEADER.pack(
+                        self.capacity, self.error_rate, self.hashes, self.bits, self.count
+                    )
+                )
+                fv.write(self.__array)
+            os.replace(temp, filename)
+
+    @staticmethod
+    def load(filename: str):
+        """Reads a filter saved by save
+
+        Args:
+            filename (str): The file to load from
+
+        Returns:
+            Bloom_Filter: The filter saved, None if the file is missing or damaged
+        """
+        try:
+            with open(filename, "rb") as fv:
+                header = fv.read(_HEADER.size)
+                array = fv.read()
+        except FileNotFoundError:
+            return None
+        if len(header) != _HEADER.size:
+            return None
+        capacity, error_rate, hashes, bits, count = _HEADER.unpack(header)
+        if len(array) != (bits + 7) // 8:
+            return None
+        bloom = Bloom_Filter.__new__(Bloom_Filter)
+        bloom.capacity = capacity
+        bloom.error_rate = error_rate
+        bloom.hashes = hashes
+        bloom.bits = bits
+        bloom.count = count
+        bloom.__array = bytearray(array)
+        bloom.__lock = threading.Lock()
+        return bloom
@@ -0,0 +1,164 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from . import Storage
+from .Bot_Scorer import MODEL_FILE, Bot_Scorer, transform
+from .Feature_Store import Feature_Store
+from .Instabase import COLUMNS, DB_Session_Local
+
+# Most predictions kept in memory
+CACHE_SIZE = int(os.environ.get("PREDICT_CACHE_SIZE", 100000))
+
+
+class Bot_Predictor:
+    """Scores batches of accounts against the model saved by the scraper. The model is memory
+    mapped once and mapped again only after the scraper replaces the file, the features of
+    usernames are read in one query per batch and the scores of recent usernames are kept in
+    an LRU cache, which is emptied with each new model. Usernames already moved off the local
+    database are found in the feature store
+    """
+
+    __LOGGER = logging.getLogger()
+
+    def __init__(
+        self, filename=MODEL_FILE, url=Storage.LOCAL_URL, cache_size=CACHE_SIZE, store=None
+    ):
+        """
+        Args:
+            filename (str, optional): File the model is saved to. Defaults to MODEL_FILE.
+            url (str, optional): The url of the local database. Defaults to Storage.LOCAL_URL.
+            cache_size (int, optional): Most scores cached. Defaults to CACHE_SIZE.
+            store (Feature_Store, optional): The feature store searched for the usernames
+            missing from the local database. Defaults to the feature store of url.
+        """
+        self.filename = filename
+        self.url = url
+        self.cache_size = cache_size
+        self.store = store or Feature_Store(url=url)
+        # Sequence of the store manifest and the usernames and raw features loaded from it
+        self.__stored = (None, None, None)
+        self.__lock = threading.Lock()
+        self.__cache = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+        self.__mtime = None
+        self.__model = None
+        self.model()
+
+    def model(self):
+        """Returns the saved model, mapped again when the file has changed since it was mapped
+
+        Returns:
+            np.ndarray: The clusters by center, count and spread, None until a model is saved
+        """
+        try:
+            mtime = os.stat(self.filename).st_mtime_ns
+        except FileNotFoundError:
+            return self.__model
+        if mtime != self.__mtime:
+            with self.__lock:
+                if mtime != self.__mtime:
+                    try:
+                        self.__model = np.load(self.filename, mmap_mode="r")
+                    except ValueError as err:
+                        Bot_Predictor.__LOGGER.warning(f"Kept the model loaded, {err}")
+                        return self.__model
+                    self.__mtime = mtime
+                    self.__cache.clear()
+        return self.__model
+
+    def predict_rows(self, rows) -> list:
+        """Scores rows of features in one vectorized call
+
+        Args:
+            rows (Iterable[Iterable[float]]): posts, followers, following, private, bio_tag,
+            external_url and verified of each account
+
+        Returns:
+            list: The bot likelihood of each row, None while no model is saved
+        """
+        model = self.model()
+        samples = np.asarray(rows, dtype="float64").reshape(-1, 7)
+        if model is None:
+            return None
+        if not len(samples):
+            return []
+        return Bot_Scorer.score_model(model, transform(samples)).tolist()
+
+    def predict_users(self, users: list) -> tuple:
+        """Scores the stored features of the given users, users scored recently come from the
+        cache and the rest are read together
+
+        Args:
+            users (list): A list of usernames
+
+        Returns:
+            tuple: The bot likelihood by username and the usernames with no stored features,
+            None and the users while no model is saved
+        """
+        model = self.model()
+        users = list(dict.fromkeys(users))
+        if model is None:
+            return None, users
+        scores = {}
+        with self.__lock:
+            for user in users:
+                if user in self.__cache:
+                    self.__cache.move_to_end(user)
+                    scores[user] = self.__cache[user]
+            self.__hits += len(scores)
+            self.__misses += len(users) - len(scores)
+        missing = [user for user in users if user not in scores]
+        if missing:
+            with DB_Session_Local(self.url) as db:
+                rows = db.lookup(missing)
+            found = {row[0] for row in rows}
+            rows.extend(self.__stored_rows([user for user in missing if user not in found]))
+            if rows:
+                found = Bot_Scorer.score_model(
+                    model, transform([row[1:] for row in rows])
+                ).tolist()
+                scores.update(zip((row[0] for row in rows), found))
+                self.__remember(model, zip((row[0] for row in rows), found))
+        return (
+            {user: scores[user] for user in users if user in scores},
+            [user for user in users if user not in scores],
+        )
+
+    def __stored_rows(self, users: list) -> list:
+        """Returns the rows of the users kept by the feature store, the store is loaded again
+        only after a build has added a partition to it
+        """
+        if not users:
+            return []
+        sequence = self.store.manifest()["sequence"]
+        stored = self.__stored
+        if stored[0] != sequence:
+            # Loaded outside the lock so cached scores are served meanwhile
+            stored = (sequence, *self.store.load(COLUMNS[1:]))
+            self.__stored = stored
+        _, usernames, features = stored
+        indexes = np.flatnonzero(np.isin(usernames, users))
+        return [(str(usernames[i]), *features[i].tolist()) for i in indexes]
+
+    def __remember(self, model, scores) -> None:
+        with self.__lock:
+            # Scores of a model replaced meanwhile are not kept
+            if model is not self.__model:
+                return
+            self.__cache.update(scores)
+            while len(self.__cache) > self.cache_size:
+                self.__cache.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {
+                "cached": len(self.__cache),
+                "hits": self.__hits,
+                "misses": self.__misses,
+                "loaded": self.__model is not None,
+            }
@@ -0,0 +1,187 @@
+import logging
+import os
+import threading
+
+import numpy as np
+
+# Saved model, one row per cluster holding its center, member count and spread
+MODEL_FILE = os.environ.get("BOT_MODEL", "bot_model.npy")
+CLUSTERS = int(os.environ.get("BOT_CLUSTERS", 4))
+# Weights of the transformed features and bias giving the bot likelihood of a cluster center:
+# following far more than followed, few posts, no bio tag, no link and not verified
+_BOT_WEIGHTS = np.array([-0.4, -0.8, 0.8, 0.0, -1.0, -1.0, -3.0])
+_BOT_BIAS = 1.0
+
+
+def transform(samples) -> np.ndarray:
+    """Log scales the counts of the account features so accounts with millions of followers
+    do not pull every cluster towards them
+
+    Args:
+        samples (np.ndarray): Samples by posts, followers, following, private, bio_tag,
+        external_url and verified
+
+    Returns:
+        np.ndarray: The transformed samples
+    """
+    samples = np.asarray(samples, dtype="float64")
+    transformed = samples.copy()
+    transformed[:, :3] = np.log1p(np.clip(samples[:, :3], 0, None))
+    return transformed
+
+
+class Bot_Scorer:
+    """Online k-means over the account features, updated with each batch written so it keeps
+    following the accounts scraped without a full retrain. An account is scored with the bot
+    likelihood of the clusters weighted by how close it is to each of them. The counts are capped
+    so older batches are gradually forgotten
+    """
+
+    __LOGGER = logging.getLogger()
+
+    def __init__(self, filename=MODEL_FILE, clusters=CLUSTERS, max_count=10000, save_every=10):
+        """
+        Args:
+            filename (str, optional): File the model is saved to. Defaults to MODEL_FILE.
+            clusters (int, optional): The amount of clusters. Defaults to CLUSTERS.
+            max_count (int, optional): Most samples a cluster remembers. Defaults to 10000.
+            save_every (int, optional): Batches fitted between saves. Defaults to 10.
+        """
+        self.filename = filename
+        self.clusters = clusters
+        self.max_count = max_count
+        self.save_every = save_every
+        self.batches = 0
+        self.__lock = threading.Lock()
+        self.__model = None
+        self.load()
+
+    def is_fitted(self) -> bool:
+        return self.__model is not None
+
+    @staticmethod
+    def __priors(centers: np.ndarray) -> np.ndarray:
+        return 1 / (1 + np.exp(-(centers @ _BOT_WEIGHTS + _BOT_BIAS)))
+
+    @staticmethod
+    def __distances(samples: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        return ((samples[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+
+    @staticmethod
+    def score_model(model: np.ndarray, samples) -> np.ndarray:
+        """Scores transformed samples against a model array, used by the readers of a saved model
+
+        Args:
+            model (np.ndarray): The clusters by center, count and spread array
+            samples (np.ndarray): The transformed samples
+
+        Returns:
+            np.ndarray: The bot likelihood of each sample between 0 and 1
+        """
+        centers, spread = model[:, :-2], model[:, -1]
+        distances = Bot_Scorer.__distances(samples, centers)
+        # Closer clusters weigh more, relative to how spread out their members are
+        logits = -distances / np.maximum(spread, 1e-6)
+        logits -= logits.max(axis=1, keepdims=True)
+        weights = np.exp(logits)
+        weights /= weights.sum(axis=1, keepdims=True)
+        return weights @ Bot_Scorer.__priors(centers)
+
+    def __initialize(self, samples: np.ndarray) -> None:
+        # Centers are picked k-means++ style from the first batch with enough distinct accounts
+        rng = np.random.default_rng(0)
+        centers = [samples[rng.integers(len(samples))]]
+        for _ in range(1, self.clusters):
+            distances = self.__distances(samples, np.array(centers)).min(axis=1)
+            centers.append(samples[rng.choice(len(samples), p=distances / distances.sum())])
+        centers = np.array(centers)
+        model = np.zeros((self.clusters, samples.shape[1] + 2))
+        model[:, :-2] = centers
+        model[:, -1] = 1.0
+        self.__model = model
+
+    def partial_fit(self, samples) -> None:
+        """Moves each cluster towards the mean of the samples assigned to it, by the share of
+        its members they make up
+
+        Args:
+            samples (np.ndarray): The untransformed samples of a batch
+        """
+        samples = transform(samples)
+        with self.__lock:
+            if self.__model is None:
+                if len(np.unique(samples, axis=0)) < self.clusters:
+                    return
+                self.__initialize(samples)
+            model = self.__model
+            centers = model[:, :-2]
+            distances = self.__distances(samples, centers)
+            labels = distances.argmin(axis=1)
+            nearest = distances[np.arange(len(samples)), labels]
+            for cluster in np.unique(labels):
+                members = labels == cluster
+                added = members.sum()
+                count = min(model[cluster, -2] + added, max(self.max_count, added))
+                share = added / count
+                centers[cluster] += share * (samples[members].mean(axis=0) - centers[cluster])
+                model[cluster, -1] += share * (nearest[members].mean() - model[cluster, -1])
+                model[cluster, -2] = count
+            self.batches += 1
+            if self.batches % self.save_every == 0:
+                self.__save()
+
+    def score(self, samples):
+        """Returns the bot likelihood of each sample
+
+        Args:
+            samples (np.ndarray): The untransformed samples
+
+        Returns:
+            np.ndarray: The scores between 0 and 1, None until the model has been fitted
+        """
+        with self.__lock:
+            if self.__model is None:
+                return None
+            return self.score_model(self.__model, transform(samples))
+
+    def score_rows(self, rows: list) -> list:
+        """Fits the model with rows of accounts then scores them
+
+        Args:
+            rows (list): Tuples of a username followed by the features
+
+        Returns:
+            list: The rows with their score appended, None while the model has seen too few
+            distinct accounts to be fitted
+        """
+        if not rows:
+            return []
+        samples = np.array([row[1:8] for row in rows], dtype="float64")
+        self.partial_fit(samples)
+        scores = self.score(samples)
+        if scores is None:
+            return [(*row[:8], None) for row in rows]
+        return [(*row[:8], float(score)) for row, score in zip(rows, scores)]
+
+    def __save(self) -> None:
+        temp = f"{self.filename}.tmp.npy"
+        np.save(temp, self.__model)
+        os.replace(temp, self.filename)
+
+    def save(self) -> None:
+        """Writes the model to a temporary file and moves it over the saved one"""
+        with self.__lock:
+            if self.__model is not None:
+                self.__save()
+
+    def load(self) -> None:
+        """Restores the model saved by a previous process"""
+        try:
+            model = np.load(self.filename)
+        except (FileNotFoundError, ValueError):
+            return
+        with self.__lock:
+            if model.shape[0] != self.clusters:
+                Bot_Scorer.__LOGGER.warning(f"Ignored model with {model.shape[0]} clusters")
+                return
+            self.__model = np.array(model)
@@ -0,0 +1,198 @@
+import heapq
+import itertools
+import math
+import threading
+
+# Marks a heap entry whose user was removed or rescheduled
+_REMOVED = object()
+
+
+class Cadence_Wheel:
+    """Rotation of the followees ordered by the time each one is next due to be checked, which
+    is predicted from the rate they post at. The rate is a time weighted moving average of the
+    posts counted between two checks, so accounts that post often come up often and dormant
+    accounts come up less and less, every account still comes up within the max interval.
+    Adding, rescheduling and removing take O(log n). The heap is guarded by a lock so the API
+    can peek at it while the scheduler thread checks users
+    """
+
+    def __init__(
+        self,
+        default_interval=86400.0,
+        min_interval=300.0,
+        max_interval=86400.0,
+        horizon=7 * 86400.0,
+        backoff=0.5,
+    ):
+        """
+        Args:
+            default_interval (float, optional): Seconds between posts assumed for an account
+            with no history. Defaults to a day.
+            min_interval (float, optional): Fewest seconds between two checks of an account.
+            Defaults to 300.
+            max_interval (float, optional): Most seconds between two checks of an account.
+            Defaults to a day.
+            horizon (float, optional): Seconds of history the posting rate mostly reflects.
+            Defaults to a week.
+            backoff (float, optional): Fraction of the interval between posts waited between
+            two checks. Defaults to 0.5.
+        """
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.horizon = horizon
+        self.backoff = backoff
+        self.__heap = []
+        self.__entries = {}
+        # Interval between posts, latest post, post count and time of the last check of each user
+        self.__cadence = {}
+        self.__sequence = itertools.count()
+        self.__lock = threading.RLock()
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__entries)
+
+    def __contains__(self, user) -> bool:
+        with self.__lock:
+            return user in self.__entries
+
+    def __iter__(self):
+        with self.__lock:
+            return iter(list(self.__entries))
+
+    def __push(self, user, due: float) -> None:
+        entry = self.__entries.get(user)
+        if entry is not None:
+            entry[-1] = _REMOVED
+        entry = [due, next(self.__sequence), user]
+        self.__entries[user] = entry
+        heapq.heappush(self.__heap, entry)
+        # Rebuild once the entries left behind outnumber the live ones
+        if len(self.__heap) > 2 * len(self.__entries) + 64:
+            self.__heap = [e for e in self.__heap if e[-1] is not _REMOVED]
+            heapq.heapify(self.__heap)
+
+    def __top(self):
+        while self.__heap and self.__heap[0][-1] is _REMOVED:
+            heapq.heappop(self.__heap)
+        return self.__heap[0] if self.__heap else None
+
+    def add(self, user, last_post=None, interval=None, due=None) -> None:
+        """Adds the user, a user with no due time is due right away
+
+        Args:
+            user (str): The username
+            last_post (float, optional): Time of the latest post seen. Defaults to None.
+            interval (float, optional): Average seconds between posts. Defaults to
+            default_interval.
+            due (float, optional): Time the user is next checked. Defaults to 0.
+        """
+        with self.__lock:
+            self.__cadence[user] = [interval or self.default_interval, last_post, None, None]
+            self.__push(user, due or 0.0)
+
+    def remove(self, user):
+        """Removes the user
+
+        Returns:
+            str: The user, None if it was not in the wheel
+        """
+        with self.__lock:
+            entry = self.__entries.pop(user, None)
+            if entry is None:
+                return None
+            entry[-1] = _REMOVED
+            del self.__cadence[user]
+            return user
+
+    def find(self, user):
+        with self.__lock:
+            return user if user in self.__entries else None
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__heap = []
+            self.__entries = {}
+            self.__cadence = {}
+
+    def is_empty(self) -> bool:
+        with self.__lock:
+            return not self.__entries
+
+    def peek(self):
+        """Returns the user checked next, None if the wheel is empty"""
+        with self.__lock:
+            top = self.__top()
+            return top[-1] if top else None
+
+    def due(self, now: float, limit=None) -> list:
+        """Returns the users due at the given time, most overdue first, they stay in the wheel
+        until they are checked
+
+        Args:
+            now (float): The current time in seconds since the epoch
+            limit (int, optional): The most users returned. Defaults to every user due.
+
+        Returns:
+            list: The usernames
+        """
+        entries = []
+        with self.__lock:
+            while limit is None or len(entries) < limit:
+                top = self.__top()
+                if top is None or top[0] > now:
+                    break
+                entries.append(heapq.heappop(self.__heap))
+            for entry in entries:
+                heapq.heappush(self.__heap, entry)
+        return [entry[-1] for entry in entries]
+
+    def checked(self, user, now: float, post=None, count=None) -> float:
+        """Updates the posting rate of the user from a check at the given time and schedules
+        the next check
+
+        Args:
+            user (str): The username
+            now (float): Time of the check in seconds since the epoch
+            post (float, optional): Time of the latest post found. Defaults to None.
+            count (int, optional): Amount of posts of the user. Defaults to None.
+
+        Returns:
+            float: The time the user is next due
+        """
+        with self.__lock:
+            return self.__checked(user, now, post, count)
+
+    def __checked(self, user, now: float, post, count) -> float:
+        cadence = self.__cadence[user]
+        interval, last_post, last_count, last_check = cadence
+        if count is not None and last_count is not None and now > last_check:
+            # Posts counted since the last check, weighted by the time the check covers
+            elapsed = now - last_check
+            weight = 1 - math.exp(-elapsed / self.horizon)
+            rate = 1 / interval
+            rate += weight * (max(count - last_count, 0) / elapsed - rate)
+            interval = max(1 / max(rate, 1e-9), self.min_interval)
+        elif post is not None and last_post is not None and post > last_post:
+            # Without counts the gap between the latest posts is the only evidence
+            interval += 0.3 * ((post - last_post) - interval)
+            interval = max(interval, self.min_interval)
+        if post is not None and (last_post is None or post > last_post):
+            last_post = post
+        cadence[:] = [interval, last_post, count, now]
+        due = now + min(max(interval * self.backoff, self.min_interval), self.max_interval)
+        self.__push(user, due)
+        return due
+
+    def state(self) -> dict:
+        """Returns the average interval and due time of each user
+
+        Returns:
+            dict: The interval and due time by username
+        """
+        with self.__lock:
+            return {
+                user: (self.__cadence[user][0], entry[0])
+                for user, entry in self.__entries.items()
+            }
@@ -0,0 +1,204 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+import traceback
+
+# Put in a queue to tell the stage reading it to finish
+_DONE = object()
+
+
+class Comment_Pipeline:
+    """Collects the data of the owners of a stream of comments in three stages. The calling
+    thread reads the comments lazily and queues the owners to fetch, worker threads fetch them
+    and a single writer commits the rows in groups. The queues are bounded so a slow stage holds
+    the ones before it back and memory stays the same however many comments there are
+    """
+
+    __LOGGER = logging.getLogger()
+
+    def __init__(
+        self,
+        fetch,
+        write,
+        select=None,
+        workers=4,
+        queue_size=None,
+        batch_size=50,
+        flush_interval=5.0,
+        stop_on=(),
+    ):
+        """
+        Args:
+            fetch (Callable[[Profile], tuple]): Returns the row of an owner
+            write (Callable[[list], None]): Commits a group of rows
+            select (Callable[[dict], list], optional): Takes a batch of owners by username and
+            returns the usernames to fetch in order. Defaults to every username.
+            workers (int, optional): The amount of fetch workers. Defaults to 4.
+            queue_size (int, optional): The most items waiting in a queue. Defaults to twice
+            the workers.
+            batch_size (int, optional): The most rows in a commit. Defaults to 50.
+            flush_interval (float, optional): The most seconds a row waits to be committed.
+            Defaults to 5.0.
+            stop_on (tuple, optional): Exception classes raised by fetch that stop the pipeline,
+            other exceptions only skip the owner. Defaults to ().
+        """
+        self.fetch = fetch
+        self.write = write
+        self.select = select or list
+        self.workers = workers
+        self.queue_size = queue_size or 2 * workers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stop_on = tuple(stop_on)
+        self.__lock = threading.Lock()
+        self.__stats = {}
+        self.__stopping = threading.Event()
+
+    def __count(self, name: str, amount=1) -> None:
+        with self.__lock:
+            self.__stats[name] = self.__stats.get(name, 0) + amount
+
+    def __depth(self, name: str, depth: int) -> None:
+        with self.__lock:
+            self.__stats[name] = max(self.__stats.get(name, 0), depth)
+
+    def run(self, comments, limit=None) -> dict:
+        """Collects the data of the owners of the comments, each owner is fetched once
+
+        Args:
+            comments (Iterator[PostComment]): The comments, read as they are needed
+            limit (int, optional): The most owners fetched. Defaults to no limit.
+
+        Returns:
+            dict: The stats of the run
+        """
+        self.__stats = {}
+        self.__stopping = threading.Event()
+        self.__fetch_queue = queue.Queue(maxsize=self.queue_size)
+        self.__write_queue = queue.Queue(maxsize=self.queue_size)
+        start = time.perf_counter()
+        fetchers = [
+            threading.Thread(target=self.__fetcher, name=f"Fetcher-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        writer = threading.Thread(target=self.__writer, name="Writer", daemon=True)
+        for thread in fetchers + [writer]:
+            thread.start()
+        try:
+            self.__produce(comments, limit)
+        finally:
+            for _ in fetchers:
+                self.__fetch_queue.put(_DONE)
+            for thread in fetchers:
+                thread.join()
+            self.__write_queue.put(_DONE)
+            writer.join()
+        return self.stats(time.perf_counter() - start)
+
+    def stop(self) -> None:
+        """Stops reading comments, the owners already queued are dropped and the run is
+        reported as stopped
+        """
+        self.__stopping.set()
+
+    def __produce(self, comments, limit) -> None:
+        checked = set()
+        queued = 0
+        while not self.__stopping.is_set():
+            read = list(itertools.islice(comments, self.batch_size))
+            if not read:
+                break
+            self.__count("read", len(read))
+            batch = {}
+            for comment in read:
+                if comment.owner.username not in checked:
+                    batch.setdefault(comment.owner.username, comment.owner)
+            checked.update(batch)
+            for user in self.select(batch):
+                if self.__stopping.is_set() or queued == limit:
+                    return
+                # Blocks while the workers are behind
+                self.__fetch_queue.put(batch[user])
+                self.__depth("fetch_depth", self.__fetch_queue.qsize())
+                queued += 1
+                self.__count("queued")
+            if queued == limit:
+                return
+
+    def __fetcher(self) -> None:
+        while True:
+            owner = self.__fetch_queue.get()
+            if owner is _DONE:
+                return
+            if self.__stopping.is_set():
+                self.__count("dropped")
+                continue
+            try:
+                row = self.fetch(owner)
+            except self.stop_on as err:
+                Comment_Pipeline.__LOGGER.warning(f"Stopped fetching commenters, {err}")
+                self.__count("failed")
+                self.stop()
+                continue
+            except Exception as err:
+                Comment_Pipeline.__LOGGER.debug(f"Skipped commenter, {err!r}")
+                self.__count("failed")
+                continue
+            self.__count("fetched")
+            self.__write_queue.put(row)
+            self.__depth("write_depth", self.__write_queue.qsize())
+
+    def __writer(self) -> None:
+        rows = []
+        deadline = time.monotonic() + self.flush_interval
+        done = False
+        while not done:
+            try:
+                row = self.__write_queue.get(timeout=max(0, deadline - time.monotonic()))
+                if row is _DONE:
+                    done = True
+                else:
+                    rows.append(row)
+            except queue.Empty:
+                pass
+            if rows and (
+                done or len(rows) >= self.batch_size or time.monotonic() >= deadline
+            ):
+                self.__commit(rows)
+                rows = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+    def __commit(self, rows: list) -> None:
+        try:
+            self.write(rows)
+        except Exception as _:
+            Comment_Pipeline.__LOGGER.error(traceback.format_exc())
+            self.__count("lost", len(rows))
+            self.stop()
+            return
+        self.__count("written", len(rows))
+        self.__count("commits")
+
+    def stats(self, elapsed=None) -> dict:
+        """Returns the counts of each stage and their rate over the elapsed time
+
+        Args:
+            elapsed (float, optional): The seconds the run took. Defaults to None.
+
+        Returns:
+            dict: The counts, rates per second and largest depth of each queue, stopped is
+            True when the run was cut short so some owners were neither fetched nor written
+        """
+        with self.__lock:
+            stats = dict(self.__stats)
+        stats["stopped"] = self.__stopping.is_set()
+        for name in ("read", "queued", "fetched", "failed", "written", "commits"):
+            stats.setdefault(name, 0)
+        if elapsed:
+            stats["seconds"] = elapsed
+            for name in ("read", "fetched", "written"):
+                stats[f"{name}_rate"] = stats[name] / elapsed
+        return stats
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+from . import Storage
+from .Instabase import DB_Session_Local
+
+# Seconds the data of a scraped account is used before it is fetched again
+FEATURE_TTL = int(os.environ.get("FEATURE_TTL", 24 * 60 * 60))
+
+
+class Feature_Cache:
+    """Tells which accounts have to be fetched, an account stays fresh for the ttl after its
+    data is inserted into the local database so repeat commenters cost no requests
+    """
+
+    def __init__(self, url=Storage.LOCAL_URL, ttl=FEATURE_TTL):
+        """
+        Args:
+            url (str, optional): The url of the local database. Defaults to Storage.LOCAL_URL.
+            ttl (int, optional): Seconds an account stays fresh. Defaults to FEATURE_TTL.
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.__url = url
+        self.__lock = threading.Lock()
+
+    def stale(self, users: list) -> list:
+        """Returns the users that have not been scraped within the ttl
+
+        Args:
+            users (list): A list of usernames
+
+        Returns:
+            list: The usernames to fetch, in the order given
+        """
+        if not users:
+            return []
+        with DB_Session_Local(self.__url) as db:
+            fresh = db.fresh(users, time.time() - self.ttl)
+        stale = [user for user in users if user not in fresh]
+        with self.__lock:
+            self.hits += len(users) - len(stale)
+            self.misses += len(stale)
+        return stale
+
+    def prune(self) -> int:
+        """Deletes the entries that have gone stale
+
+        Returns:
+            int: The number of entries deleted
+        """
+        with DB_Session_Local(self.__url) as db:
+            return db.prune(time.time() - self.ttl)
+
+    def stats(self) -> dict:
+        """Returns the hits and misses counted since the process started
+
+        Returns:
+            dict: The hits, misses, hit rate and ttl
+        """
+        with self.__lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else None,
+                "ttl": self.ttl,
+            }
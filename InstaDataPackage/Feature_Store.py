@@ -0,0 +1,191 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from . import Storage
+from .Instabase import COLUMNS, DB_Session_Local
+
+# Directory the partitions and their manifest are kept in
+STORE_DIR = os.environ.get("FEATURE_STORE", "feature_store")
+# Columns derived from the counts of an account when it is added to the store
+DERIVED = [
+    "log_posts",
+    "log_followers",
+    "log_following",
+    "follower_ratio",
+    "posts_per_follower",
+]
+STORE_COLUMNS = COLUMNS[1:] + DERIVED
+_USERNAME = "U30"
+
+
+def derive(samples) -> np.ndarray:
+    """Appends the derived columns to samples of the raw account features
+
+    Args:
+        samples (np.ndarray): Samples by posts, followers, following, private, bio_tag,
+        external_url and verified
+
+    Returns:
+        np.ndarray: The samples by STORE_COLUMNS
+    """
+    samples = np.asarray(samples, dtype="float64")
+    raw = len(COLUMNS) - 1
+    counts = np.clip(samples[:, :3], 0, None)
+    posts, followers, following = counts.T
+    features = np.empty((len(samples), len(STORE_COLUMNS)), dtype="float64")
+    features[:, :raw] = samples
+    features[:, raw : raw + 3] = np.log1p(counts)
+    features[:, -2] = followers / np.maximum(following, 1)
+    features[:, -1] = posts / np.maximum(followers, 1)
+    return features
+
+
+def _latest(usernames: np.ndarray) -> np.ndarray:
+    # Index of the last occurrence of each username, in the order they were added
+    _, first = np.unique(usernames[::-1], return_index=True)
+    return np.sort(len(usernames) - 1 - first)
+
+
+class Feature_Store:
+    """Columnar copy of the accounts table for training. Each build appends the accounts written
+    since the previous one as a partition of .npy files with the derived columns already
+    computed, so training maps the files instead of parsing and deriving the features again.
+    An account written again is added again, loads keep its latest row and the partitions are
+    merged into one once there are too many. The manifest is replaced after the partitions are
+    written so readers never see a partition that is half written
+    """
+
+    def __init__(
+        self, directory=STORE_DIR, url=Storage.LOCAL_URL, settle=60.0, max_partitions=16
+    ):
+        """
+        Args:
+            directory (str, optional): Directory of the store. Defaults to STORE_DIR.
+            url (str, optional): The url of the local database. Defaults to Storage.LOCAL_URL.
+            settle (float, optional): Seconds an account is left out of the store after it is
+            written, so a transaction committing late is not skipped. Defaults to 60.0.
+            max_partitions (int, optional): Most partitions before they are merged. Defaults to 16.
+        """
+        self.directory = directory
+        self.url = url
+        self.settle = settle
+        self.max_partitions = max_partitions
+
+    def __path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def manifest(self) -> dict:
+        """Returns the columns, the partitions and the time the store is built up to"""
+        try:
+            with open(self.__path("manifest.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"columns": STORE_COLUMNS, "watermark": -1, "sequence": 0, "partitions": []}
+
+    def __write_manifest(self, manifest: dict) -> None:
+        temp = self.__path("manifest.json.tmp")
+        with open(temp, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(temp, self.__path("manifest.json"))
+
+    def __write_partition(self, manifest: dict, usernames, features) -> dict:
+        manifest["sequence"] += 1
+        name = f"part-{manifest['sequence']:05d}"
+        np.save(self.__path(f"{name}.users.npy"), usernames)
+        np.save(self.__path(f"{name}.features.npy"), features)
+        return {"name": name, "rows": len(usernames)}
+
+    def build(self, chunk_size=100000) -> int:
+        """Appends the accounts written since the last build as a new partition
+
+        Args:
+            chunk_size (int, optional): The amount of rows fetched at a time. Defaults to 100000.
+
+        Returns:
+            int: The number of rows appended
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = self.manifest()
+        cutoff = time.time() - self.settle
+        usernames, features = [], []
+        with DB_Session_Local(self.url) as db:
+            for chunk in db.scraped(manifest["watermark"], cutoff, chunk_size):
+                usernames.append(np.array([row[0] for row in chunk], dtype=_USERNAME))
+                features.append(derive([row[1:] for row in chunk]))
+        if usernames:
+            manifest["partitions"].append(
+                self.__write_partition(
+                    manifest, np.concatenate(usernames), np.concatenate(features)
+                )
+            )
+        manifest["watermark"] = max(cutoff, manifest["watermark"])
+        self.__write_manifest(manifest)
+        if len(manifest["partitions"]) > self.max_partitions:
+            self.compact()
+        return sum(len(names) for names in usernames)
+
+    def partitions(self):
+        """Yields the usernames and features of each partition, memory mapped"""
+        for partition in self.manifest()["partitions"]:
+            yield (
+                np.load(self.__path(f"{partition['name']}.users.npy"), mmap_mode="r"),
+                np.load(self.__path(f"{partition['name']}.features.npy"), mmap_mode="r"),
+            )
+
+    def load(self, columns=None) -> tuple:
+        """Returns the latest row of each account, memory mapped without a copy while the store
+        is a single partition and the columns are consecutive
+
+        Args:
+            columns (list, optional): The columns returned. Defaults to STORE_COLUMNS.
+
+        Returns:
+            tuple: The usernames and a samples by columns array
+        """
+        parts = list(self.partitions())
+        if not parts:
+            usernames = np.empty(0, dtype=_USERNAME)
+            features = np.empty((0, len(STORE_COLUMNS)), dtype="float64")
+        elif len(parts) == 1:
+            usernames, features = parts[0]
+        else:
+            usernames = np.concatenate([part[0] for part in parts])
+            features = np.concatenate([part[1] for part in parts])
+            latest = _latest(usernames)
+            usernames, features = usernames[latest], features[latest]
+        if columns is None:
+            return usernames, features
+        indexes = [STORE_COLUMNS.index(column) for column in columns]
+        if indexes == list(range(indexes[0], indexes[0] + len(indexes))):
+            return usernames, features[:, indexes[0] : indexes[-1] + 1]
+        return usernames, features[:, indexes]
+
+    def compact(self) -> int:
+        """Merges the partitions into one holding the latest row of each account
+
+        Returns:
+            int: The number of rows in the merged partition
+        """
+        manifest = self.manifest()
+        if len(manifest["partitions"]) < 2:
+            return sum(partition["rows"] for partition in manifest["partitions"])
+        usernames, features = self.load()
+        merged = manifest["partitions"]
+        manifest["partitions"] = [self.__write_partition(manifest, usernames, features)]
+        self.__write_manifest(manifest)
+        # Readers that mapped the old files keep them until they let go of them
+        for partition in merged:
+            for kind in ("users", "features"):
+                os.remove(self.__path(f"{partition['name']}.{kind}.npy"))
+        return len(usernames)
+
+    def stats(self) -> dict:
+        manifest = self.manifest()
+        return {
+            "partitions": len(manifest["partitions"]),
+            "rows": sum(partition["rows"] for partition in manifest["partitions"]),
+            "watermark": manifest["watermark"],
+        }
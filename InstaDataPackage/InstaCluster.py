@@ -1,21 +1,169 @@
-from sklearn.cluster import KMeans
+import concurrent.futures
+import json
+import os
+import time
+
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
 import numpy as np
-import csv
+import pandas as pd
 from matplotlib import pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from . import Storage
+from .Feature_Store import STORE_DIR, Feature_Store
+
+# Columns of an account used as features, in the order of the csv exports
+FEATURES = [
+    "posts",
+    "followers",
+    "following",
+    "private",
+    "bio_tag",
+    "external_url",
+    "verified",
+]
+# Instagram usernames are at most 30 characters, a fixed width lets the cache be memory mapped
+_USERNAME = "U30"
+
+
+def _count_rows(filename: str) -> int:
+    rows = 0
+    last = b"\n"
+    with open(filename, "rb") as fv:
+        for block in iter(lambda: fv.read(1 << 20), b""):
+            rows += block.count(b"\n")
+            last = block[-1:]
+    return rows + (last != b"\n")
+
+
+def _cache_files(filename: str) -> tuple:
+    return f"{filename}.users.npy", f"{filename}.features.npy"
+
+
+def load_csv(filename, chunk_size=100000, cache=True) -> tuple:
+    """Parses an export of accounts into a preallocated float64 array one chunk at a time,
+    the arrays are saved to a binary cache next to the csv which is memory mapped by the next
+    loads until the csv changes
+
+    Args:
+        filename (str): The csv of accounts, a username followed by the features on each line
+        chunk_size (int, optional): The amount of lines parsed at a time. Defaults to 100000.
+        cache (bool, optional): Whether to use and write the binary cache. Defaults to True.
+
+    Returns:
+        tuple: The usernames and a samples by features array
+    """
+    users_file, features_file = _cache_files(filename)
+    if cache and all(
+        os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(filename)
+        for path in (users_file, features_file)
+    ):
+        return np.load(users_file, mmap_mode="r"), np.load(features_file, mmap_mode="r")
+    size = _count_rows(filename)
+    usernames = np.empty(size, dtype=_USERNAME)
+    samples = np.empty((size, len(FEATURES)), dtype="float64")
+    filled = 0
+    for chunk in pd.read_csv(
+        filename,
+        header=None,
+        names=["username"] + FEATURES,
+        dtype={"username": str, **{column: "float64" for column in FEATURES}},
+        chunksize=chunk_size,
+    ):
+        usernames[filled : filled + len(chunk)] = chunk["username"].to_numpy()
+        samples[filled : filled + len(chunk)] = chunk[FEATURES].to_numpy()
+        filled += len(chunk)
+    # Blank lines are counted but not parsed
+    usernames, samples = usernames[:filled], samples[:filled]
+    if cache:
+        np.save(users_file, usernames)
+        np.save(features_file, samples)
+    return usernames, samples
+
+
+def load_table(url=Storage.LOCAL_URL, table="accounts", chunk_size=100000) -> tuple:
+    """Reads the accounts of a database table into a preallocated float64 array one chunk at a
+    time, Storage.server_url() and insta_train read the training data of DB_Session
+
+    Args:
+        url (str, optional): The url of the database. Defaults to Storage.LOCAL_URL.
+        table (str, optional): The table of accounts. Defaults to "accounts".
+        chunk_size (int, optional): The amount of rows fetched at a time. Defaults to 100000.
+
+    Returns:
+        tuple: The usernames and a samples by features array
+    """
+    connection = Storage.connect(url)
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        size = cursor.fetchone()[0]
+        usernames = np.empty(size, dtype=_USERNAME)
+        samples = np.empty((size, len(FEATURES)), dtype="float64")
+        cursor.execute(f"SELECT username, {', '.join(FEATURES)} FROM {table}")
+        filled = 0
+        chunk = cursor.fetchmany(chunk_size)
+        # Rows inserted after the count are left for the next load
+        while chunk and filled < size:
+            chunk = chunk[: size - filled]
+            names, values = _split_rows(chunk)
+            usernames[filled : filled + len(chunk)] = names
+            samples[filled : filled + len(chunk)] = values
+            filled += len(chunk)
+            chunk = cursor.fetchmany(chunk_size)
+        cursor.close()
+    finally:
+        connection.close()
+    return usernames[:filled], samples[:filled]
+
+
+def _split_rows(rows: list) -> tuple:
+    usernames = np.array([row[0] for row in rows], dtype=_USERNAME)
+    samples = np.array([row[1:] for row in rows], dtype="float64")
+    return usernames, samples
+
+
+def load_rows(rows: list) -> tuple:
+    """Splits rows of accounts such as the ones returned by DB_Session.show()
+
+    Args:
+        rows (list): Tuples of a username followed by the features
+
+    Returns:
+        tuple: The usernames and a samples by features array
+    """
+    if not rows:
+        return np.empty(0, dtype=_USERNAME), np.empty((0, len(FEATURES)), dtype="float64")
+    return _split_rows(rows)
+
+
+def load_store(directory=STORE_DIR, columns=None) -> tuple:
+    """Maps the accounts of the feature store built by the scraper, the derived columns are
+    already computed so nothing is parsed
+
+    Args:
+        directory (str, optional): Directory of the store. Defaults to STORE_DIR.
+        columns (list, optional): The columns loaded. Defaults to FEATURES.
+
+    Returns:
+        tuple: The usernames and a samples by columns array
+    """
+    return Feature_Store(directory).load(columns or FEATURES)
+
 
 # Basic Clustering
 def convert_csv(filename):
+    """Returns the features of the accounts of a csv export
 
-    with open(filename, newline="") as fv:
-        reader = csv.reader(fv)
-        data = [row for row in reader]
+    Args:
+        filename (str): The csv of accounts
 
-    for row in data:
-        row.pop(0)
-        for i in range(len(row)):
-            row[i] = int(row[i])
-
-    return np.array(data).astype("float64")
+    Returns:
+        np.ndarray: A samples by features float64 array
+    """
+    return load_csv(filename)[1]
 
 
 def display_clusters(model, samples):
@@ -37,21 +185,119 @@ def display_clusters(model, samples):
     plt.show()
 
 
-def evaluate_model(samples):
-    num_clusters = range(1, 6)
-    inertias = []
+# Samples of a worker process, set once by the pool initializer instead of sent with each task
+_SAMPLES = None
 
-    for k in num_clusters:
 
-        model = KMeans(n_clusters=k)
+def _init_worker(samples) -> None:
+    global _SAMPLES
+    _SAMPLES = samples
 
-        model.fit(samples)
 
-        inertias.append(model.inertia_)
+def _fit(k: int, minibatch: bool, sample_size: int, seed: int) -> dict:
+    """Fits a model with k clusters on the samples of the worker and scores it"""
+    start = time.perf_counter()
+    if minibatch:
+        model = MiniBatchKMeans(n_clusters=k, batch_size=4096, n_init=3, random_state=seed)
+    else:
+        model = KMeans(n_clusters=k, random_state=seed)
+    labels = model.fit_predict(_SAMPLES)
+    silhouette = None
+    # The silhouette is only defined for 2 to n - 1 clusters
+    if 1 < k < len(_SAMPLES) and len(np.unique(labels)) > 1:
+        silhouette = float(
+            silhouette_score(
+                _SAMPLES,
+                labels,
+                sample_size=min(sample_size, len(_SAMPLES)),
+                random_state=seed,
+            )
+        )
+    return {
+        "k": k,
+        "inertia": float(model.inertia_),
+        "silhouette": silhouette,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def evaluate_model(
+    samples,
+    k_range=range(1, 6),
+    json_path=None,
+    png_path=None,
+    show=True,
+    processes=None,
+    minibatch_threshold=100000,
+    sample_size=10000,
+    seed=0,
+) -> dict:
+    """Fits a model for each amount of clusters across a process pool and scores it with its
+    inertia and its silhouette on a sample. Inputs larger than the threshold are fitted with
+    MiniBatchKMeans. The results can be written to json and the elbow plot to a png, show=False
+    keeps it from opening a window so it can run in batch jobs
+
+    Args:
+        samples (np.ndarray): A samples by features array
+        k_range (Iterable[int], optional): The amounts of clusters tried. Defaults to range(1, 6).
+        json_path (str, optional): File the results are written to. Defaults to None.
+        png_path (str, optional): File the elbow plot is written to. Defaults to None.
+        show (bool, optional): Whether to show the elbow plot. Defaults to True.
+        processes (int, optional): The amount of worker processes. Defaults to the CPU count.
+        minibatch_threshold (int, optional): Samples above which MiniBatchKMeans is used.
+        Defaults to 100000.
+        sample_size (int, optional): Samples the silhouette is computed on. Defaults to 10000.
+        seed (int, optional): Seed of the models and of the sampling. Defaults to 0.
+
+    Returns:
+        dict: The method used and the inertia, silhouette and seconds taken for each k
+    """
+    start = time.perf_counter()
+    k_range = list(k_range)
+    samples = np.asarray(samples, dtype="float64")
+    minibatch = len(samples) > minibatch_threshold
+    processes = min(processes or os.cpu_count() or 1, len(k_range))
+    args = [(k, minibatch, sample_size, seed) for k in k_range]
+    if processes > 1:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_worker, initargs=(samples,)
+        ) as executor:
+            results = list(executor.map(_fit, *zip(*args)))
+    else:
+        _init_worker(samples)
+        results = [_fit(*arg) for arg in args]
+        _init_worker(None)
+    evaluation = {
+        "samples": len(samples),
+        "method": "MiniBatchKMeans" if minibatch else "KMeans",
+        "processes": processes,
+        "results": results,
+        "seconds": time.perf_counter() - start,
+    }
+    if json_path:
+        with open(json_path, "w") as fv:
+            json.dump(evaluation, fv, indent=2)
+    if png_path or show:
+        _plot_inertia(k_range, [result["inertia"] for result in results], png_path, show)
+    return evaluation
 
-    plt.plot(num_clusters, inertias, "-o")
-    plt.xlabel("number of clusters, k")
-    plt.ylabel("inertia")
-    plt.xticks(num_clusters)
-    plt.show()
 
+def _plot_inertia(k_range, inertias, png_path, show) -> None:
+    if show:
+        plt.plot(k_range, inertias, "-o")
+        plt.xlabel("number of clusters, k")
+        plt.ylabel("inertia")
+        plt.xticks(k_range)
+        if png_path:
+            plt.savefig(png_path)
+        plt.show()
+        return
+    # Drawn without pyplot so no display is needed
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    axes.plot(k_range, inertias, "-o")
+    axes.set_xlabel("number of clusters, k")
+    axes.set_ylabel("inertia")
+    axes.set_xticks(k_range)
+    figure.savefig(png_path)
@@ -1,32 +1,47 @@
 # Imports
+import calendar
 import concurrent.futures
 import logging
 import os
 import pickle
 import sys
+import threading
 import time
 import traceback
+from collections import deque
 from datetime import datetime
 from random import choice
 
 import instaloader
 import requests
-from instaloader import Profile
+from instaloader import NodeIterator, Profile
 from instaloader.exceptions import (
-    ProfileNotExistsException,
     QueryReturnedNotFoundException,
     ConnectionException,
     QueryReturnedBadRequestException,
 )
 from notify_run import Notify
 from pytz import timezone
+from .Array_List import Array_List
+from .Bloom_Filter import Bloom_Filter
+from .Bot_Scorer import Bot_Scorer
+from .Cadence_Wheel import Cadence_Wheel
+from .Comment_Pipeline import Comment_Pipeline
+from .Feature_Cache import Feature_Cache
+from .Feature_Store import Feature_Store
 from .Instabase import DB_Session, DB_Session_Local, DB_Session_Sheets
-from .Linked_List import Linked_List
+from .Rate_Limit import CircuitOpenError, Governor
+from .State_Store import State_Store
 
 # from Linked_List import Wheel
 # from Instabase import *
 
 
+def _epoch(date_stamp: datetime) -> float:
+    """Returns the seconds since the epoch of a naive UTC date stamp"""
+    return float(calendar.timegm(date_stamp.utctimetuple()))
+
+
 class Instabot:
     # Initialize basic logger
     logging.basicConfig(
@@ -39,6 +54,42 @@ class Instabot:
     # Set the timezone and intialize notification to send messages during execution
     __EST = timezone("Canada/Eastern")
     __NOTIFICATION = Notify()
+    # Maximum amount of followers polled at the same time during a pass, the governor still
+    # holds the pass to IG_RATE / 2 polls per second once its burst is spent
+    MAX_WORKERS = int(os.environ.get("IG_WORKERS", 8))
+    # Commenters fetched at the same time and the most fetched for a post, 0 for no limit
+    COMMENT_WORKERS = int(os.environ.get("IG_COMMENT_WORKERS", 4))
+    COMMENT_LIMIT = int(os.environ.get("IG_COMMENT_LIMIT", 200))
+    # Most followers polled in a pass, 0 for every follower due
+    PASS_BUDGET = int(os.environ.get("IG_PASS_BUDGET", 0))
+    # Most posts of a follower caught up on in a poll and posts harvested at the same time
+    CATCH_UP = int(os.environ.get("IG_CATCH_UP", 12))
+    POST_WORKERS = int(os.environ.get("IG_POST_WORKERS", 2))
+    # Fewest and most seconds between two checks of a follower
+    __MIN_CHECK = float(os.environ.get("IG_MIN_CHECK", 300))
+    __MAX_CHECK = float(os.environ.get("IG_MAX_CHECK", 86400))
+    # Request budget shared by every request sent to Instagram, saved between processes
+    __GOVERNOR = Governor(
+        os.environ.get("IG_GOVERNOR", "governor.json"),
+        rate=float(os.environ.get("IG_RATE", 0.5)),
+        capacity=int(os.environ.get("IG_BURST", 20)),
+        trip_on=(ConnectionException, QueryReturnedBadRequestException),
+    )
+    # Accounts scraped within the ttl are not fetched again
+    __FEATURES = Feature_Cache()
+    # Columnar copy of the accounts scraped, extended after each pass for training
+    __FEATURE_STORE = Feature_Store()
+    # Usernames of every account scraped, loaded on first use and saved next to the state
+    __SEEN = None
+    __SEEN_LOCK = threading.Lock()
+    __SEEN_FILE = os.environ.get("SEEN_FILTER", "seen.bloom")
+    __SEEN_CAPACITY = int(os.environ.get("SEEN_CAPACITY", 1_000_000))
+    __SEEN_ERROR_RATE = float(os.environ.get("SEEN_ERROR_RATE", 0.01))
+    # Scores the commenters as they are written, loaded on first use
+    __SCORER = None
+    # State saved between processes, the Instaloader session is kept in its own file
+    __STORE = State_Store()
+    __SESSION_FILE = os.path.abspath(os.environ.get("IG_SESSION", "session"))
 
     def __init__(
         self, username=os.environ.get("IG_USER"), password=os.environ.get("IG_PASS")
@@ -46,11 +97,17 @@ class Instabot:
         # Create an Instaloader instance
         self.__I_session = instaloader.Instaloader(max_connection_attempts=1)
         self.__I_session.login(username, password)
-        self.users = Linked_List()
+        self.__I_session.save_session_to_file(Instabot.__SESSION_FILE)
+        self.users = Array_List()
+        # Date stamp of the latest post seen for each user
+        self.watermarks = {}
+        # Order the users are polled in, by when they are next expected to post
+        self.schedule = Instabot.new_schedule()
         self.date_stamp = datetime(
             datetime.today().year, datetime.today().month, datetime.today().day, 0, 0
         )
         self.cooldown = False
+        self.stop_date = None
         self.add_users()
 
     # Time wrapper to get the execution time of a function
@@ -76,41 +133,192 @@ class Instabot:
         Instabot.__LOGGER.debug("Testing notification")
         Instabot.__NOTIFICATION.send("Testing Notification")
 
-    def add_users(self) -> None:
-        """Adds the followers of the account and changes the date stamp to the most recent post
+    def add_users(self, chunk_size=50) -> None:
+        """Syncs the followers of the account with the saved ones, only the followers added since
+        the last sync have their latest post fetched and the state is saved after every chunk of
+        them so an interrupted sync resumes where it stopped
+
+        Args:
+            chunk_size (int, optional): The amount of followers added between saves.
+            Defaults to 50.
         """
-        users = Profile.from_username(
-            self.__I_session.context, os.environ.get("IG_USER")
-        ).get_followees()
-        if not self.users.is_empty():
-            self.users.clear()
-        for user in users:
-            self.users.append(user.username)
-            Instabot.__LOGGER.debug(f"Added User {user.username}")
+        # Adding the users is started by hand so it also closes the circuit breakers
+        self.reset_cooldown()
+        known = set(self.users)
+        current = set()
+        added = {}
+        # Fetching the profile and its first page of followees takes two requests
+        with Instabot.__GOVERNOR.request(cost=2):
+            followees = Profile.from_username(
+                self.__I_session.context, os.environ.get("IG_USER")
+            ).get_followees()
+        for user in Instabot.__GOVERNOR.paged(followees, NodeIterator.page_length()):
+            current.add(user.username)
+            if user.username not in known:
+                added[user.username] = user
+        removed = known - current
+        if removed:
+            self.users = Array_List(user for user in self.users if user not in removed)
+            for user in removed:
+                self.watermarks.pop(user, None)
+                self.schedule.remove(user)
+                Instabot.__LOGGER.debug(f"Removed User {user}")
+            self.save_bot()
+        for i, (username, user) in enumerate(added.items(), 1):
             date_stamp = self.set_date_user(user)
-            if date_stamp > self.date_stamp:
-                self.date_stamp = date_stamp
+            self.users.append(username)
+            self.schedule.add(username)
+            if date_stamp is not None:
+                self.watermarks[username] = date_stamp
+                self.schedule.checked(username, time.time(), _epoch(date_stamp))
+                self.date_stamp = max(self.date_stamp, date_stamp)
+            Instabot.__LOGGER.debug(f"Added User {username}")
+            if i % chunk_size == 0:
+                self.save_bot()
+        Instabot.__LOGGER.debug(
+            f"Synced followers, {len(added)} added and {len(removed)} removed"
+        )
         Instabot.__LOGGER.debug(f"New Date Stamp: {self.date_stamp}")
-        if self.cooldown:
-            self.reset_cooldown()
         self.stop_date = None
         self.save_bot()
 
-    def set_date_user(self, profile: Profile) -> datetime:
+    def set_date_user(self, profile: Profile):
         """Obtains the latest post of the profile given and returns the date stamp of the post in UTC
 
         Args:
             profile (Profile): The profile to find the latest post of 
 
         Returns:
-            datetime: The UTC date stamp of the profiles latest post
+            datetime: The UTC date stamp of the profiles latest post, None if it has no posts
         """
-        date_stamp = next(profile.get_posts()).date_utc
-        return date_stamp
+        with Instabot.__GOVERNOR.request():
+            post = next(profile.get_posts(), None)
+        return None if post is None else post.date_utc
 
-    # Reset cooldown
+    # Reset cooldown and close the circuit breakers
     def reset_cooldown(self) -> None:
-        self.cooldown = not self.cooldown
+        self.cooldown = False
+        Instabot.__GOVERNOR.reset()
+
+    @staticmethod
+    def governor() -> Governor:
+        """Returns the rate limit governor shared by the requests of every bot
+
+        Returns:
+            Governor: The governor of the process
+        """
+        return Instabot.__GOVERNOR
+
+    @staticmethod
+    def features() -> Feature_Cache:
+        """Returns the feature cache consulted before a commenter is fetched
+
+        Returns:
+            Feature_Cache: The feature cache of the process
+        """
+        return Instabot.__FEATURES
+
+    @staticmethod
+    def store() -> Feature_Store:
+        """Returns the feature store the accounts scraped are appended to
+
+        Returns:
+            Feature_Store: The feature store of the process
+        """
+        return Instabot.__FEATURE_STORE
+
+    @staticmethod
+    def seen() -> Bloom_Filter:
+        """Returns the filter of the usernames scraped, it is loaded from its file on first use
+        or seeded from the server and the local database when the file is missing or the
+        filter is full
+
+        Returns:
+            Bloom_Filter: The filter of the process
+        """
+        with Instabot.__SEEN_LOCK:
+            if Instabot.__SEEN is None:
+                Instabot.__SEEN = Instabot.__load_seen()
+        return Instabot.__SEEN
+
+    @staticmethod
+    def save_seen() -> None:
+        """Saves the filter of the usernames scraped once a pass is over, a filter that was
+        never loaded has nothing new to save
+        """
+        with Instabot.__SEEN_LOCK:
+            if Instabot.__SEEN is not None:
+                Instabot.__SEEN.save(Instabot.__SEEN_FILE)
+
+    @staticmethod
+    def __load_seen() -> Bloom_Filter:
+        seen = Bloom_Filter.load(Instabot.__SEEN_FILE)
+        if seen is None or seen.is_full():
+            capacity = Instabot.__SEEN_CAPACITY
+            if seen is not None:
+                capacity = max(capacity, seen.capacity * 2)
+            # The accounts moved off the local database are only kept by the server
+            try:
+                with DB_Session() as db:
+                    capacity = max(capacity, db.size() * 2)
+                    seen = Bloom_Filter(capacity, Instabot.__SEEN_ERROR_RATE)
+                    seen.update(db.usernames())
+            except Exception as err:
+                Instabot.__LOGGER.warning(f"Seeding filter without the server, {err}")
+                seen = Bloom_Filter(capacity, Instabot.__SEEN_ERROR_RATE)
+            with DB_Session_Local() as db:
+                seen.update(db.usernames())
+            seen.save(Instabot.__SEEN_FILE)
+            Instabot.__LOGGER.debug(f"Seeded filter with {seen.count} usernames")
+        return seen
+
+    @staticmethod
+    def scorer() -> Bot_Scorer:
+        """Returns the bot scorer updated with the commenters written, loaded on first use
+
+        Returns:
+            Bot_Scorer: The scorer of the process
+        """
+        with Instabot.__SEEN_LOCK:
+            if Instabot.__SCORER is None:
+                Instabot.__SCORER = Bot_Scorer()
+        return Instabot.__SCORER
+
+    @staticmethod
+    def new_schedule(users=(), watermarks=None, schedule=None) -> Cadence_Wheel:
+        """Returns a schedule of the users, the users with no saved schedule are due right away
+
+        Args:
+            users (Iterable[str], optional): The usernames. Defaults to ().
+            watermarks (dict, optional): The date stamp of the latest post seen for each user.
+            Defaults to None.
+            schedule (dict, optional): The saved interval and due time of each user.
+            Defaults to None.
+
+        Returns:
+            Cadence_Wheel: The schedule
+        """
+        wheel = Cadence_Wheel(
+            min_interval=Instabot.__MIN_CHECK, max_interval=Instabot.__MAX_CHECK
+        )
+        watermarks = watermarks or {}
+        schedule = schedule or {}
+        for user in users:
+            watermark = watermarks.get(user)
+            interval, due = schedule.get(user, (None, None))
+            wheel.add(
+                user,
+                last_post=None if watermark is None else _epoch(watermark),
+                interval=interval,
+                due=due,
+            )
+        return wheel
+
+    def __reschedule(self, user: str, post: datetime = None, count: int = None) -> None:
+        if user in self.schedule:
+            self.schedule.checked(
+                user, time.time(), None if post is None else _epoch(post), count
+            )
 
     # Find the most recent post and take it's date
     def set_date_stamp(self) -> None:
@@ -121,26 +329,60 @@ class Instabot:
         self.reset_cooldown()
         self.set_date_stamp()
 
-    # Load the bot from a pickle file
+    # Load the bot from the state store
     @staticmethod
     def load_bot():
-        """Loads the saved Instabot object from the pickle file
+        """Loads the saved Instabot from the state store and its session file, a bot saved
+        to the pickle file by an older version is moved into the store on first load
 
         Returns:
-            Instabot: Saved Instabot object from pickle file
+            Instabot: Saved Instabot object
         """
-        with open("bot.pickle", "rb") as pickle_in:
-            bot = pickle.load(pickle_in)
+        state = Instabot.__STORE.load()
+        if state is None:
+            with open("bot.pickle", "rb") as pickle_in:
+                bot = pickle.load(pickle_in)
+            bot.__dict__.setdefault("watermarks", {})
+            bot.users = Array_List(bot.users)
+            bot.schedule = Instabot.new_schedule(bot.users, bot.watermarks)
+            bot.__I_session.save_session_to_file(Instabot.__SESSION_FILE)
+            bot.save_bot()
+            Instabot.__LOGGER.debug("Moved bot from pickle file to state store")
+            return bot
+        bot = Instabot.__new__(Instabot)
+        bot.__I_session = instaloader.Instaloader(max_connection_attempts=1)
+        bot.__I_session.load_session_from_file(
+            os.environ.get("IG_USER"), Instabot.__SESSION_FILE
+        )
+        bot.users = Array_List()
+        bot.watermarks = {}
+        for user, watermark in state["followees"]:
+            bot.users.append(user)
+            if watermark is not None:
+                bot.watermarks[user] = watermark
+        bot.schedule = Instabot.new_schedule(
+            bot.users, bot.watermarks, state["schedule"]
+        )
+        for name, value in state["values"].items():
+            setattr(bot, name, value)
         Instabot.__LOGGER.debug("Loaded Bot")
         return bot
 
-    # Save the bot to a pickle file
+    # Save the changes to the state of the bot
     def save_bot(self):
-        """Saves the Instabot object to the pickle file for next use
+        """Saves the state of the Instabot that changed since the last save for next use
         """
-        with open("bot.pickle", "wb") as pickle_out:
-            pickle.dump(self, pickle_out, protocol=pickle.HIGHEST_PROTOCOL)
-        Instabot.__LOGGER.debug("Exported to pickle file")
+        rows = Instabot.__STORE.save(
+            {
+                "date_stamp": self.date_stamp,
+                "cooldown": self.cooldown,
+                "stop_date": self.stop_date,
+            },
+            self.users,
+            self.watermarks,
+            self.schedule.state(),
+        )
+        Instabot.__LOGGER.debug(f"Saved {rows} changes to state store")
 
     # Calculate the file size of the csv in MegaBytes
     def file_size(self):
@@ -159,58 +401,137 @@ class Instabot:
         """
         return Profile.from_username(self.__I_session.context, user)
 
-    def monitor_user(self, user: str):
-        """Checks to see if the date stamp of the users most recent post is greater than the current
-        held date stamp, if so then the data of the commenters of the post will be collected
+    def poll_user(self, user: str) -> tuple:
+        """Walks the posts of the user back to its watermark without changing the state of the
+        bot, so that it can be run from a worker thread. Pinned posts are passed over and a user
+        with no watermark only has its latest post read. Only the oldest CATCH_UP posts newer
+        than the watermark are returned, the newer ones are caught up on by the next polls
 
         Args:
             user (str): The username of the profile to be accessed
+
+        Returns:
+            tuple: The username, the outcome of the request and what it produced, for a post
+            the latest post and the posts newer than the watermark oldest first
         """
         try:
-            profile = self.get_profile(user)
-            post = next(profile.get_posts())
-            if post.date_utc > self.date_stamp:
+            watermark = self.watermarks.get(user)
+            latest = None
+            # Walking newest first, the posts kept last are the oldest
+            posts = deque(maxlen=Instabot.CATCH_UP or None)
+            skipped = 0
+            # Fetching the profile and its first page of posts takes two requests
+            with Instabot.__GOVERNOR.request(cost=2):
+                profile = self.get_profile(user)
+                pages = profile.get_posts()
+            # A catch up walking past the first page pays for each page it fetches
+            for post in Instabot.__GOVERNOR.paged(pages, NodeIterator.page_length()):
+                pinned = getattr(post, "is_pinned", False)
+                if latest is None or post.date_utc > latest.date_utc:
+                    latest = post
+                if watermark is not None and post.date_utc > watermark:
+                    if len(posts) == posts.maxlen:
+                        skipped += 1
+                    posts.append(post)
+                elif not pinned:
+                    break
+            if latest is None:
+                return user, "no_post", None
+            if skipped:
+                Instabot.__LOGGER.warning(
+                    f"Catch up of {user} left {skipped} newer posts for the next poll"
+                )
+            return user, "post", (latest, sorted(posts, key=lambda post: post.date_utc))
+        except CircuitOpenError as err:
+            return user, "cooldown", err
+        except QueryReturnedNotFoundException as err:
+            return user, "not_found", err
+        except QueryReturnedBadRequestException as err:
+            return user, "bad_request", err
+        except ConnectionException as err:
+            return user, "connection", err
+        except Exception as _:
+            return user, "error", traceback.format_exc()
+
+    def merge_result(self, result: tuple) -> bool:
+        """Applies the outcome of a poll to the bot, the data of the commenters of every post
+        newer than the watermark of the user will be collected. A user polled for the first
+        time only has its watermark set
+
+        Args:
+            result (tuple): The username, outcome and payload returned by poll_user
+
+        Returns:
+            bool: False if the pass has to be stopped, True otherwise
+        """
+        user, outcome, payload = result
+        if outcome == "post":
+            latest, posts = payload
+            # The profile of the post was fetched by the poll so its post count is free
+            self.__reschedule(user, latest.date_utc, latest.owner_profile.mediacount)
+            self.date_stamp = max(self.date_stamp, latest.date_utc)
+            if user not in self.watermarks:
+                self.watermarks[user] = latest.date_utc
+                Instabot.__LOGGER.debug(f"Set watermark of {user}")
+            elif posts:
                 Instabot.__NOTIFICATION.send("New Post")
-                Instabot.__LOGGER.debug("New Post Found")
-                self.date_stamp = post.date_utc
-                self.commenters(post.get_comments())
-                self.save_bot()
+                Instabot.__LOGGER.debug(f"{len(posts)} New Posts Found for {user}")
+                self.harvest(user, posts)
             else:
-                Instabot.__LOGGER.debug("No new posts")
-                self.save_bot()
+                Instabot.__LOGGER.debug(f"No new posts for {user}")
 
-        # If the post is unavailable send a notification and save the bot
-        except QueryReturnedNotFoundException as err:
+        elif outcome == "no_post":
+            self.__reschedule(user, count=0)
+            Instabot.__LOGGER.debug(f"{user} has no posts")
+
+        # The governor is holding requests back until a breaker closes
+        elif outcome == "cooldown":
+            Instabot.__LOGGER.debug(f"Skipped {user}, {payload}")
+
+        # If the post is unavailable send a notification
+        elif outcome == "not_found":
+            self.__reschedule(user)
             Instabot.__NOTIFICATION.send("404 Error Code")
-            Instabot.__LOGGER.warning(f"{err}")
+            Instabot.__LOGGER.warning(f"{payload}")
 
-        except QueryReturnedBadRequestException as err:
-            Instabot.__LOGGER.warning(f"{err}")
+        elif outcome == "bad_request":
+            Instabot.__LOGGER.warning(f"{payload}")
             Instabot.__NOTIFICATION.send(
                 f"Verification needed to access Instagram {datetime.now(Instabot.__EST)}"
             )
             self.cooldown = True
             self.stop_date = datetime.now(Instabot.__EST)
             self.save_bot()
-            self.stop_scrape()
+            return False
 
-        # If too many requests has been sent reset cooldown and save
-        except ConnectionException as err:
+        # If too many requests has been sent cool down until the governor lets requests through
+        elif outcome == "connection":
             Instabot.__NOTIFICATION.send(
                 f"Can't get info on post need to cool down, {datetime.now(Instabot.__EST)}"
             )
-            Instabot.__LOGGER.warning(f"{err}")
+            Instabot.__LOGGER.warning(f"{payload}")
             self.cooldown = True
             self.stop_date = datetime.now(Instabot.__EST)
             self.save_bot()
+            return False
+
+        # Report an unexpected error and stop the cronjob
+        elif outcome == "error":
+            Instabot.__LOGGER.error(payload)
+            Instabot.__NOTIFICATION.send(f"{payload},{datetime.now(Instabot.__EST)}")
             self.stop_scrape()
-        # Except an unexpected error and exit the program
-        except Exception as err:
-            Instabot.__LOGGER.error(traceback.format_exc())
-            Instabot.__NOTIFICATION.send(
-                f"{traceback.format_exc()},{datetime.now(Instabot.__EST)}"
-            )
-            self.stop_scrape()
+        return True
+
+    def monitor_user(self, user: str):
+        """Checks the posts of the user newer than its watermark, the data of the commenters of
+        each of them will be collected
+
+        Args:
+            user (str): The username of the profile to be accessed
+        """
+        self.merge_result(self.poll_user(user))
+        self.save_bot()
+        Instabot.save_seen()
 
     def stop_scrape(self) -> None:
         """Sends a request to stop the cronjob the local machine
@@ -220,8 +541,12 @@ class Instabot:
                 "username": os.environ.get("username"),
                 "password": os.environ.get("password"),
             }
+            token = requests.post(
+                f"http://localhost:{os.environ.get('port')}/login", json=json_data,
+            ).json()["token"]
             response = requests.post(
-                f"http://localhost:{os.environ.get('port')}/stop", json=json_data,
+                f"http://localhost:{os.environ.get('port')}/stop",
+                headers={"Authorization": f"Bearer {token}"},
             )
             Instabot.__LOGGER.debug(
                 f"Local Request Status Code: {response.status_code}"
@@ -235,46 +560,121 @@ class Instabot:
                 f"{traceback.format_exc()},{datetime.now(Instabot.__EST)}"
             )
 
-    def monitor_users(self) -> None:
-        """Gets the saved followers usernames and rotates each time to see the date stamp of their
-        most recent post
+    def monitor_users(self, max_workers: int = None) -> None:
+        """Polls the followers that are due concurrently for the date stamp of their most recent
+        post, then merges the results back most overdue first so a pass is deterministic. Followers
+        that post often are due more often, the ones that were not polled stay due for the next pass.
+        The pass is skipped while the governor is cooling down and resumes once it has closed
+
+        Args:
+            max_workers (int, optional): The amount of followers polled at the same time.
+            Defaults to Instabot.MAX_WORKERS.
         """
+        retry_after = Instabot.__GOVERNOR.retry_after()
+        self.cooldown = retry_after > 0
         if not self.cooldown:
-            for user in self.users:
-                Instabot.__LOGGER.debug(f"Monitoring {user}")
-                self.monitor_user(user)
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers or Instabot.MAX_WORKERS
+            ) as executor:
+                users = self.schedule.due(time.time(), Instabot.PASS_BUDGET or None)
+                results = list(executor.map(self.poll_user, users))
+            for result in results:
+                Instabot.__LOGGER.debug(f"Monitoring {result[0]}")
+                if not self.merge_result(result):
+                    break
+            self.save_bot()
+            Instabot.__GOVERNOR.save()
+            Instabot.save_seen()
+            Instabot.__FEATURE_STORE.build()
+            Instabot.__FEATURES.prune()
+            Instabot.scorer().save()
         else:
-            Instabot.__LOGGER.warning("429 Need to cooldown")
+            Instabot.__LOGGER.warning(f"429 Need to cooldown for {retry_after:.0f} seconds")
+
+    def harvest(self, user: str, posts: list) -> None:
+        """Collects the commenters of the posts in parallel, the watermark of the user moves
+        past a post once it and every older post have been harvested and is saved each time,
+        so every post is harvested once even if the pass is interrupted. A post whose pipeline
+        was stopped by a failure is not harvested and is tried again on the next poll, the
+        harvests of the posts after it that have not started are cancelled
+
+        Args:
+            user (str): The username the posts belong to
+            posts (list): The posts, oldest first
+        """
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(len(posts), Instabot.POST_WORKERS)
+        ) as executor:
+            harvests = [executor.submit(self.__harvest_post, post) for post in posts]
+            for post, harvested in zip(posts, harvests):
+                try:
+                    stats = harvested.result()
+                except Exception as _:
+                    Instabot.__LOGGER.error(traceback.format_exc())
+                    stats = {"stopped": True}
+                if stats["stopped"]:
+                    Instabot.__LOGGER.warning(
+                        f"Harvest of {user} stopped at the post of {post.date_utc}"
+                    )
+                    # The watermark stays behind the post so the rest would be harvested again
+                    for pending in harvests:
+                        pending.cancel()
+                    break
+                self.watermarks[user] = post.date_utc
+                self.save_bot()
+
+    def __harvest_post(self, post):
+        return self.commenters(Instabot.__comments(post))
+
+    @staticmethod
+    def __comments(post):
+        # The first page is fetched with the post's comments, the rest as they are read
+        with Instabot.__GOVERNOR.request():
+            comments = post.get_comments()
+        if isinstance(comments, list):
+            # Every comment came with the post so no page is fetched
+            return iter(comments)
+        return Instabot.__GOVERNOR.paged(comments, NodeIterator.page_length())
 
     @timer
-    def commenters(self, comments, limit=20):
-        """Create a ThreadPoolExecutor instance in order to create seperate request for each user's information
-		Pass the extract_data function into the executor and loop through the results 
-		Take the processed information and insert into local database
+    def commenters(self, comments, limit=COMMENT_LIMIT):
+        """Collects the data of the commenters through a Comment_Pipeline, the comments are read
+		as the fetch workers free up and the rows are inserted into the local database in groups
+		Commenters never seen before are fetched first, the ones seen are only fetched once
+		they have gone stale in the feature cache
 
         Args:
             comments (Iterator[PostCommentAnswer]): A generator of comments for a post 
-            limit (int, optional): The amount of commenters to extract data from. Defaults to 20.
+            limit (int, optional): The most commenters to extract data from, 0 for no limit.
+            Defaults to COMMENT_LIMIT.
         """
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            shared_data_list = []
-            try:
-                for _ in range(limit):
-                    shared_data_list.append(
-                        executor.submit(self.extract_data, next(comments).owner)
-                    )
-            except StopIteration:
-                Instabot.__LOGGER.debug("End of comment generator")
-            finally:
-                with DB_Session_Local() as db:
-                    for shared_data in concurrent.futures.as_completed(
-                        shared_data_list
-                    ):
-                        try:
-                            db.insert(shared_data.result())
-                            Instabot.__LOGGER.debug("Inserted User into database")
-                        except ProfileNotExistsException:
-                            Instabot.__LOGGER.debug("Profile not available")
+        pipeline = Comment_Pipeline(
+            self.extract_data,
+            self.__write_commenters,
+            select=self.__select_commenters,
+            workers=Instabot.COMMENT_WORKERS,
+            stop_on=(CircuitOpenError, ConnectionException, QueryReturnedBadRequestException),
+        )
+        stats = pipeline.run(comments, limit or None)
+        Instabot.__LOGGER.debug(f"Commenter pipeline {stats}")
+        return stats
+
+    @staticmethod
+    def __select_commenters(batch: dict) -> list:
+        # Only the commenters the filter has seen can be fresh in the cache
+        known = {user for user in batch if user in Instabot.seen()}
+        unknown = [user for user in batch if user not in known]
+        return unknown + Instabot.__FEATURES.stale(
+            [user for user in batch if user in known]
+        )
+
+    @staticmethod
+    def __write_commenters(rows: list) -> None:
+        rows = Instabot.scorer().score_rows(rows)
+        with DB_Session_Local() as db:
+            db.insert_many(rows)
+        Instabot.seen().update(row[0] for row in rows)
+        Instabot.__LOGGER.debug(f"Inserted {len(rows)} users into database")
 
     def extract_data(self, profile: Profile):
         """Helper method to extract the data from the given profile
@@ -285,16 +685,17 @@ class Instabot:
         Returns:
             tuple: A tuple of the processed info from the profile
         """
-        info = (
-            profile.username,
-            profile.mediacount,
-            profile.followers,
-            profile.followees,
-            int(profile.is_private),
-            int("@" in str(profile.biography.encode("utf-8"))),
-            int(profile.external_url is not None),
-            int(profile.is_verified),
-        )
+        with Instabot.__GOVERNOR.request():
+            info = (
+                profile.username,
+                profile.mediacount,
+                profile.followers,
+                profile.followees,
+                int(profile.is_private),
+                int("@" in str(profile.biography.encode("utf-8"))),
+                int(profile.external_url is not None),
+                int(profile.is_verified),
+            )
         return info
 
     def export_to_file(self, filename, shared_data_list):
@@ -313,13 +714,12 @@ class Instabot:
             h_map = {}
             shared_data_list = []
             for line in fv:
-                info = line.split(",")
+                info = line.rstrip("\n").split(",")
                 if info[0] not in h_map:
                     shared_data_list.append(tuple(info))
                     h_map[info[0]] = None
         with DB_Session() as db:
-            for shared_data in shared_data_list:
-                db.insert(shared_data)
+            db.insert_many(shared_data_list)
             print(db.size())
 
     def collect_data(self):
@@ -329,8 +729,7 @@ class Instabot:
     def collect_users_data(self, users):
         shared_data_list = [self.extract_data(user) for user in users]
         with DB_Session() as db:
-            for shared_data in shared_data_list:
-                db.insert(shared_data)
+            db.insert_many(shared_data_list)
 
     def show_users_data(self, users):
         h_map = {}
@@ -1,19 +1,76 @@
 import os
-import sqlite3
+import threading
+import time
 
 import gspread
-import mysql.connector
 import pandas as pd
-from mysql.connector.errors import IntegrityError
+
+from . import Storage
+
+# Columns of an account row, the local table also keeps the score of the account
+COLUMNS = [
+    "username",
+    "posts",
+    "followers",
+    "following",
+    "private",
+    "bio_tag",
+    "external_url",
+    "verified",
+]
+SCORED_COLUMNS = COLUMNS + ["bot_score"]
+# Placeholder and maximum amount of bound parameters in a statement for each backend
+_PARAMS = {"sqlite": ("?", 999), "mysql": ("%s", 10000), "postgresql": ("%s", 10000)}
+# Comparison of each backend that holds when both sides are NULL
+_SAME = {"sqlite": "IS", "mysql": "<=>", "postgresql": "IS NOT DISTINCT FROM"}
+
+
+def _upsert(dialect: str, table: str, columns=COLUMNS, keep=()) -> str:
+    """Returns the upsert of a row keyed by its first column for the backend, the values are
+    bound by the driver. A NULL given for a column in keep leaves its stored value
+    """
+    params = ",".join([_PARAMS[dialect][0]] * len(columns))
+    if dialect == "mysql":
+        new, old = "VALUES({})", "{}"
+        conflict = "ON DUPLICATE KEY UPDATE"
+    else:
+        new, old = "excluded.{}", f"{table}.{{}}"
+        conflict = f"ON CONFLICT({columns[0]}) DO UPDATE SET"
+    updates = ", ".join(
+        f"{column}=COALESCE({new.format(column)}, {old.format(column)})"
+        if column in keep
+        else f"{column}={new.format(column)}"
+        for column in columns[1:]
+    )
+    return f"INSERT INTO {table}({', '.join(columns)}) VALUES({params}) {conflict} {updates}"
 
 
 # Have to use .commit on database connection to save changes made in script
 class DB_Session_Local:
-    def __init__(self):
-        pass
+    def __init__(self, url=Storage.LOCAL_URL):
+        """
+        Args:
+            url (str, optional): The url of the local database. Defaults to Storage.LOCAL_URL.
+        """
+        self.__url = url
+        self.__cache_created = False
+        self.__score_created = False
 
     def __enter__(self):
-        self.__connection = sqlite3.connect("instabase.db")
+        # The connection is borrowed from the pool shared with the API
+        self.__connection = Storage.connect(self.__url)
+        dialect = Storage.dialect(self.__url)
+        self.__param, self.__max_params = _PARAMS[dialect]
+        # Rows are exported in the order they were inserted where the backend keeps one
+        self.__row_order = "rowid" if dialect == "sqlite" else "username"
+        self.__upsert = _upsert(dialect, "accounts")
+        # Rows written before the scorer is fitted keep the score the account already has
+        self.__scored_upsert = _upsert(dialect, "accounts", SCORED_COLUMNS, keep=["bot_score"])
+        self.__stamp = _upsert(dialect, "feature_cache", ["username", "scraped_at"])
+        # Deletes an exported row only while it still holds the values that were exported
+        self.__unchanged = "DELETE FROM accounts WHERE " + " AND ".join(
+            f"{column} {_SAME[dialect]} {self.__param}" for column in COLUMNS
+        )
         self.__cursor = self.__connection.cursor()
         return self
 
@@ -21,69 +78,277 @@ class DB_Session_Local:
         self.__cursor.close()
         self.__connection.close()
 
+    def __shrink(self) -> None:
+        """Frees a bounded amount of the pages left empty by deleted rows, the rest are freed
+        by the next calls so readers are never blocked behind a full vacuum
+        """
+        if Storage.dialect(self.__url) == "sqlite":
+            Storage.incremental_vacuum(self.__connection)
+
+    def __create_cache(self) -> None:
+        if not self.__cache_created:
+            self.__cursor.execute(
+                """CREATE TABLE IF NOT EXISTS feature_cache(
+                username VARCHAR(30) PRIMARY KEY, scraped_at REAL)"""
+            )
+            self.__cache_created = True
+
+    def create_score(self) -> None:
+        """Adds the bot_score column to an accounts table created before it existed"""
+        if not self.__score_created:
+            self.__cursor.execute("SELECT * FROM accounts LIMIT 0")
+            if "bot_score" not in [column[0] for column in self.__cursor.description]:
+                self.__cursor.execute("ALTER TABLE accounts ADD COLUMN bot_score REAL")
+                self.__connection.commit()
+            self.__score_created = True
+
     def insert(self, data: tuple):
         """Takes a list of data to be inserted into the local database
 
         Args:
             data (tuple): List of data for a user
         """
+        self.insert_many([data])
+
+    def insert_many(self, rows) -> int:
+        """Inserts the accounts into the local database, updating the ones already in it,
+        and stamps them in the feature cache in a single transaction
+
+        Args:
+            rows (Iterable[tuple]): Tuples of data for each user, a ninth value is the bot score
+
+        Returns:
+            int: The number of rows written
+        """
+        rows = list(rows)
+        scraped_at = time.time()
+        scored = bool(rows) and len(rows[0]) == len(SCORED_COLUMNS)
         try:
+            self.__create_cache()
+            if scored:
+                self.create_score()
+            self.__cursor.executemany(
+                self.__scored_upsert if scored else self.__upsert, rows
+            )
+            written = self.__cursor.rowcount
+            self.__cursor.executemany(
+                self.__stamp, [(row[0], scraped_at) for row in rows]
+            )
+            self.__connection.commit()
+        except Exception:
+            self.__connection.rollback()
+            raise
+        return written
+
+    def fresh(self, users: list, since: float) -> set:
+        """Returns the users scraped at or after the given time, the feature cache outlives the
+        accounts table so users already moved to the server are still found
+
+        Args:
+            users (list): A list of usernames
+            since (float): The oldest scrape time accepted, in seconds since the epoch
+
+        Returns:
+            set: The usernames scraped since then
+        """
+        self.__create_cache()
+        users = list(dict.fromkeys(users))
+        found = set()
+        max_params = self.__max_params - 1
+        for i in range(0, len(users), max_params):
+            chunk = users[i : i + max_params]
             self.__cursor.execute(
-                """INSERT INTO accounts VALUES('{info[0]}',{info[1]},{info[2]},
-                {info[3]},{info[4]},{info[5]},{info[6]},{info[7]}) """.format(
-                    info=data
-                )
+                f"SELECT username FROM feature_cache WHERE scraped_at >= {self.__param} "
+                f"AND username IN ({','.join([self.__param] * len(chunk))})",
+                [since, *chunk],
             )
-        except sqlite3.IntegrityError:
+            found.update(row[0] for row in self.__cursor.fetchall())
+        return found
+
+    def lookup(self, users: list) -> list:
+        """Returns the account rows of the given users, in chunks of the most parameters a
+        statement can bind
+
+        Args:
+            users (list): A list of usernames
+
+        Returns:
+            list: The rows found, by the COLUMNS of an account
+        """
+        users = list(dict.fromkeys(users))
+        rows = []
+        for i in range(0, len(users), self.__max_params):
+            chunk = users[i : i + self.__max_params]
             self.__cursor.execute(
-                """ UPDATE accounts SET posts={d[1]}, followers={d[2]}, following={d[3]}, private={d[4]},
-        		bio_tag={d[5]}, external_url={d[6]}, verified={d[7]} WHERE username='{d[0]}'""".format(
-                    d=data
-                )
+                f"SELECT {', '.join(COLUMNS)} FROM accounts "
+                f"WHERE username IN ({','.join([self.__param] * len(chunk))})",
+                chunk,
             )
+            rows.extend(self.__cursor.fetchall())
+        return rows
+
+    def usernames(self, chunk_size=10000):
+        """Yields the usernames of the accounts table and of the feature cache, which keeps
+        the accounts already moved to the server
+
+        Args:
+            chunk_size (int, optional): The amount of rows fetched at a time. Defaults to 10000.
+        """
+        self.__create_cache()
+        cursor = self.__connection.cursor()
+        cursor.execute("SELECT username FROM accounts UNION SELECT username FROM feature_cache")
+        try:
+            chunk = cursor.fetchmany(chunk_size)
+            while chunk:
+                for row in chunk:
+                    yield row[0]
+                chunk = cursor.fetchmany(chunk_size)
         finally:
-            self.__connection.commit()
+            cursor.close()
 
-    def backup(self):
-        self.__cursor.execute("SELECT * FROM accounts")
-        entries = [output for output in self.__cursor]
-        with DB_Session() as db:
-            for info in entries:
-                db.insert(info)
-        with DB_Session_Sheets() as sheet:
-            sheet.insert(entries)
-        self.__cursor.execute("DELETE FROM accounts")
-        self.__connection.commit()
-        self.__cursor.execute("vacuum")
+    def scraped(self, after: float, before: float, chunk_size=10000):
+        """Yields the accounts written after a time and before another in chunks, accounts
+        written before the feature cache existed count as written at 0
+
+        Args:
+            after (float): The time the accounts were written after, in seconds since the epoch
+            before (float): The time the accounts were written before
+            chunk_size (int, optional): The amount of rows fetched at a time. Defaults to 10000.
+        """
+        self.__create_cache()
+        cursor = self.__connection.cursor()
+        cursor.execute(
+            f"SELECT {', '.join('a.' + column for column in COLUMNS)} FROM accounts a "
+            "LEFT JOIN feature_cache f ON f.username = a.username "
+            f"WHERE COALESCE(f.scraped_at, 0) > {self.__param} "
+            f"AND COALESCE(f.scraped_at, 0) < {self.__param}",
+            (after, before),
+        )
+        try:
+            chunk = cursor.fetchmany(chunk_size)
+            while chunk:
+                yield chunk
+                chunk = cursor.fetchmany(chunk_size)
+        finally:
+            cursor.close()
+
+    def prune(self, before: float) -> int:
+        """Deletes the entries of the feature cache scraped before the given time
+
+        Args:
+            before (float): The oldest scrape time kept, in seconds since the epoch
+
+        Returns:
+            int: The number of entries deleted
+        """
+        self.__create_cache()
+        self.__cursor.execute(
+            f"DELETE FROM feature_cache WHERE scraped_at < {self.__param}", (before,)
+        )
         self.__connection.commit()
+        return self.__cursor.rowcount
+
+    def __replicate(self, db, chunk_size: int) -> tuple:
+        """Streams the entries of the local database into the session in chunks, each chunk
+        is written in a single transaction
+
+        Args:
+            db (DB_Session): The open session to write into
+            chunk_size (int): The amount of rows read and written at a time
+
+        Returns:
+            tuple: The number of rows transferred and the rows per second
+        """
+        start = time.perf_counter()
+        rows = 0
+        cursor = self.__connection.cursor()
+        cursor.execute(f"SELECT {', '.join(COLUMNS)} FROM accounts")
+        try:
+            chunk = cursor.fetchmany(chunk_size)
+            while chunk:
+                db.insert_many(chunk)
+                rows += len(chunk)
+                chunk = cursor.fetchmany(chunk_size)
+        finally:
+            cursor.close()
+        elapsed = time.perf_counter() - start
+        rate = rows / elapsed if elapsed > 0 else float(rows)
+        print(f"Transferred {rows} rows in {elapsed:.2f} seconds ({rate:.0f} rows/s)")
+        return rows, rate
+
+    def backup(self, chunk_size=1000, server=None):
+        """Copies the entries from the local database into the MySQL database and the sheet
+        then resizes the local database
 
-    def transfer_to_server(self):
+        Args:
+            chunk_size (int, optional): The amount of rows written at a time. Defaults to 1000.
+            server (DB_Session, optional): The session to copy into. Defaults to DB_Session().
+        """
+        with server or DB_Session() as db:
+            self.__replicate(db, chunk_size)
+        self.transfer_to_sheet()
+
+    def transfer_to_server(self, chunk_size=1000, server=None) -> tuple:
         """Takes the entries from the local database and inserts them into the MySQL
-        database then resizes the local database
+        database in chunks then resizes the local database
+
+        Args:
+            chunk_size (int, optional): The amount of rows written at a time. Defaults to 1000.
+            server (DB_Session, optional): The session to transfer into. Defaults to DB_Session().
+
+        Returns:
+            tuple: The number of rows transferred and the rows per second
         """
-        self.__cursor.execute("SELECT * FROM accounts")
-        with DB_Session() as db:
-            for info in self.__cursor:
-                db.insert(info)
+        with server or DB_Session() as db:
+            result = self.__replicate(db, chunk_size)
             print(db.size())
         self.__cursor.execute("DELETE FROM accounts")
         self.__connection.commit()
-        self.__cursor.execute("vacuum")
-        self.__connection.commit()
+        self.__shrink()
+        return result
 
-    def transfer_to_sheet(self):
-        self.__cursor.execute("SELECT * FROM accounts")
-        with DB_Session_Sheets() as sheet:
-            sheet.insert(self.__cursor.fetchall())
-        self.__cursor.execute("DELETE FROM accounts")
-        self.__connection.commit()
-        self.__cursor.execute("vacuum")
-        self.__connection.commit()
+    def transfer_to_sheet(self, sheet=None, chunk_size=None) -> int:
+        """Appends the entries of the local database to the sheet in chunks, the rows of a
+        chunk are deleted once the sheet has confirmed it, so a failed export resumes after
+        the last confirmed chunk. A row written again while its chunk was being appended is
+        kept and exported again with its new values
+
+        Args:
+            sheet (DB_Session_Sheets, optional): The sheet to export to. Defaults to
+            DB_Session_Sheets().
+            chunk_size (int, optional): The amount of rows appended at a time.
+            Defaults to DB_Session_Sheets.BATCH_SIZE.
+
+        Returns:
+            int: The number of rows exported
+        """
+        chunk_size = chunk_size or DB_Session_Sheets.BATCH_SIZE
+        exported = 0
+        with sheet or DB_Session_Sheets() as sheet:
+            while True:
+                self.__cursor.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM accounts "
+                    f"ORDER BY {self.__row_order} LIMIT {self.__param}",
+                    (chunk_size,),
+                )
+                chunk = self.__cursor.fetchall()
+                if not chunk:
+                    break
+                sheet.insert(chunk)
+                try:
+                    self.__cursor.executemany(self.__unchanged, chunk)
+                    self.__connection.commit()
+                except Exception:
+                    self.__connection.rollback()
+                    raise
+                exported += len(chunk)
+        self.__shrink()
+        return exported
 
     def show(self):
         """Shows the entries for the account data collected
         """
-        self.__cursor.execute("SELECT * FROM accounts")
+        self.__cursor.execute(f"SELECT {', '.join(COLUMNS)} FROM accounts")
         return self.__cursor.fetchall()
 
     def size(self):
@@ -96,37 +361,73 @@ class DB_Session_Local:
 
 
 class DB_Session_Sheets:
-    def __init__(self):
-        pass
+    # The client and the worksheets are opened once per process and reused by every session
+    __CLIENT = None
+    __WORKSHEETS = {}
+    __LOCK = threading.Lock()
+    # Most rows sent in a single request, keeps each call within the API payload limits
+    BATCH_SIZE = int(os.environ.get("SHEET_BATCH_SIZE", 500))
+
+    def __init__(self, worksheet=None):
+        """
+        Args:
+            worksheet (gspread.Worksheet, optional): The worksheet to use, any object with
+            append_rows and get_all_values can stand in for testing. Defaults to the first
+            worksheet of the SHEET_KEY spreadsheet.
+        """
+        self.__worksheet = worksheet
 
     def __enter__(self):
-        self.__gc = gspread.service_account(filename="credentials.json")
-        self.__sh = self.__gc.open_by_key(os.environ.get("SHEET_KEY"))
-        self.__worksheet = self.__sh.sheet1
+        if self.__worksheet is None:
+            self.__worksheet = DB_Session_Sheets.__open(os.environ.get("SHEET_KEY"))
         return self
 
     def __exit__(self, exc_type, exc_val, traceback):
         pass
 
+    @staticmethod
+    def __open(key: str):
+        with DB_Session_Sheets.__LOCK:
+            if DB_Session_Sheets.__CLIENT is None:
+                DB_Session_Sheets.__CLIENT = gspread.service_account(
+                    filename="credentials.json"
+                )
+            if key not in DB_Session_Sheets.__WORKSHEETS:
+                DB_Session_Sheets.__WORKSHEETS[key] = DB_Session_Sheets.__CLIENT.open_by_key(
+                    key
+                ).sheet1
+            return DB_Session_Sheets.__WORKSHEETS[key]
+
     def insert(self, data: list):
-        self.__worksheet.insert_rows(data, 2)
+        """Appends the rows to the worksheet in batches of at most BATCH_SIZE rows
+
+        Args:
+            data (list): The rows to append
+        """
+        for i in range(0, len(data), DB_Session_Sheets.BATCH_SIZE):
+            self.__worksheet.append_rows(
+                [list(row) for row in data[i : i + DB_Session_Sheets.BATCH_SIZE]]
+            )
 
     def show(self):
         return self.__worksheet.get_all_values()
 
 
 class DB_Session:
-    def __init__(self):
-        pass
+    def __init__(self, url=None):
+        """
+        Args:
+            url (str, optional): The url of the training database, a SQLite url can stand in
+            for the server when testing. Defaults to Storage.server_url().
+        """
+        self.__url = url or Storage.server_url()
 
     def __enter__(self):
-        self.__connection = mysql.connector.connect(
-            host="localhost",
-            user=os.environ.get("DB_USER"),
-            passwd=os.environ.get("DB_PASS"),
-            auth_plugin="mysql_native_password",
-            database="instabase",
-        )
+        # The connection is borrowed from the pool of the server and returned on exit
+        self.__connection = Storage.connect(self.__url)
+        dialect = Storage.dialect(self.__url)
+        self.__upsert = _upsert(dialect, "insta_train")
+        self.__param, self.__max_params = _PARAMS[dialect]
         self.__cursor = self.__connection.cursor()
         return self
 
@@ -151,22 +452,24 @@ class DB_Session:
         Args:
             data (tuple): A tuple of user information
         """
+        self.insert_many([data])
+
+    def insert_many(self, rows) -> int:
+        """Inserts user data in database, updating the users already in it, in a single transaction
+
+        Args:
+            rows (Iterable[tuple]): Tuples of user information
+
+        Returns:
+            int: The number of rows written
+        """
         try:
-            self.__cursor.execute(
-                """INSERT INTO insta_train VALUES('{info[0]}',{info[1]},{info[2]},
-            {info[3]},{info[4]},{info[5]},{info[6]},{info[7]}) """.format(
-                    info=data
-                )
-            )
-        except IntegrityError:
-            self.__cursor.execute(
-                """ UPDATE insta_train SET posts={d[1]}, followers={d[2]}, following={d[3]}, private={d[4]}, 
-                bio_tag={d[5]}, external_url={d[6]}, verified={d[7]} WHERE username='{d[0]}'""".format(
-                    d=data
-                )
-            )
-        finally:
+            self.__cursor.executemany(self.__upsert, list(rows))
             self.__connection.commit()
+        except Exception:
+            self.__connection.rollback()
+            raise
+        return self.__cursor.rowcount
 
     def size(self) -> int:
         """Returns the amount of rows in the database table
@@ -179,6 +482,47 @@ class DB_Session:
             rows = output[0]
         return rows
 
+    def usernames(self, chunk_size=10000):
+        """Yields the usernames of the database table
+
+        Args:
+            chunk_size (int, optional): The amount of rows fetched at a time. Defaults to 10000.
+        """
+        cursor = self.__connection.cursor()
+        cursor.execute("SELECT username FROM insta_train")
+        try:
+            chunk = cursor.fetchmany(chunk_size)
+            while chunk:
+                for row in chunk:
+                    yield row[0]
+                chunk = cursor.fetchmany(chunk_size)
+        finally:
+            cursor.close()
+
+    def __lookup(self, columns: str, users: list) -> list:
+        """Fetches the rows of the users with one IN query per chunk of usernames, the chunks
+        are kept within the amount of parameters the driver can bind
+
+        Args:
+            columns (str): The columns to select
+            users (list): A list of usernames
+
+        Returns:
+            list: The rows found
+        """
+        users = list(dict.fromkeys(users))
+        rows = []
+        for i in range(0, len(users), self.__max_params):
+            chunk = users[i : i + self.__max_params]
+            self.__cursor.execute(
+                "SELECT {} FROM insta_train WHERE username IN ({})".format(
+                    columns, ",".join([self.__param] * len(chunk))
+                ),
+                chunk,
+            )
+            rows.extend(self.__cursor.fetchall())
+        return rows
+
     def query(self, users: list) -> pd.DataFrame:
         """Queries and returns user data for the list of users
 
@@ -190,40 +534,21 @@ class DB_Session:
             of the user information queried for
         """
         pd.set_option("display.max_columns", None)
-        df = pd.DataFrame(
-            columns=[
-                "User",
-                "Posts",
-                "Followers",
-                "Following",
-                "Private",
-                "Bio_Tag",
-                "External_Url",
-                "Verified",
-            ]
-        )
-        for user in users:
-            self.__cursor.execute(
-                "SELECT * FROM insta_train WHERE username='{:s}'".format(user)
-            )
-            s = None
-            for output in self.__cursor:
-                s = output
-            if s:
-                df_temp = {
-                    "User": s[0],
-                    "Posts": s[1],
-                    "Followers": s[2],
-                    "Following": s[3],
-                    "Private": bool(s[4]),
-                    "Bio_Tag": bool(s[5]),
-                    "External_Url": bool(s[6]),
-                    "Verified": bool(s[7]),
-                }
-                df = df.append(df_temp, ignore_index=True)
-            else:
-                df = df.append({"User": user}, ignore_index=True)
-        return df
+        columns = [
+            "User",
+            "Posts",
+            "Followers",
+            "Following",
+            "Private",
+            "Bio_Tag",
+            "External_Url",
+            "Verified",
+        ]
+        found = pd.DataFrame(self.__lookup("*", users), columns=columns)
+        found[columns[1:4]] = found[columns[1:4]].astype("Int64")
+        found[columns[4:]] = found[columns[4:]].astype(bool)
+        # Users missing from the table are kept with only their username
+        return pd.DataFrame({"User": list(users)}).merge(found, on="User", how="left")
 
     def query_found(self, users: list) -> pd.DataFrame:
         """Searches the database table for users
@@ -234,18 +559,9 @@ class DB_Session:
         Returns:
             pd.DataFrame: Table of whether the users are in the database table
         """
-        df = pd.DataFrame(columns=["User", "Found"])
-        for user in users:
-            self.__cursor.execute(
-                "SELECT * FROM insta_train WHERE username='{:s}'".format(user)
-            )
-            s = None
-            for output in self.__cursor:
-                s = output
-            if s:
-                df = df.append({"User": user, "Found": True}, ignore_index=True)
-            else:
-                df = df.append({"User": user, "Found": False}, ignore_index=True)
+        found = [row[0] for row in self.__lookup("username", users)]
+        df = pd.DataFrame({"User": list(users)})
+        df["Found"] = df["User"].isin(found)
         return df
 
     def show(self) -> list:
@@ -2,10 +2,19 @@ from copy import deepcopy
 
 
 class _L_Node:
+    __slots__ = ("_value", "_next")
+
     def __init__(self, value, _next):
         self._value = value
         self._next = _next
 
+    # Nodes pickled before they had slots are restored from their dict
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            state = state[1]
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def __str__(self) -> str:
         return f"{self._value}-->"
 
@@ -20,12 +29,7 @@ class Linked_List:
         return self.__count
 
     def __str__(self) -> str:
-        current = self.__front
-        s = ""
-        while current:
-            s += str(current)
-            current = current._next
-        return s
+        return "".join(f"{value}-->" for value in self)
 
     def __getitem__(self, i: int):
         assert self.__valid_index(i), "Invalid index"
@@ -72,7 +76,7 @@ class Linked_List:
     def clear(self) -> None:
         self.__front = None
         self.__rear = None
-        self.__count = None
+        self.__count = 0
 
     def is_empty(self) -> bool:
         return self.__count == 0
@@ -0,0 +1,241 @@
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Returned by next once a paged iterator is exhausted
+_END = object()
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is attempted while a circuit breaker is open"""
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"{key} circuit is open, retry in {retry_after:.0f} seconds")
+        self.key = key
+        self.retry_after = retry_after
+
+
+class Governor:
+    """Token bucket shared by every request made to Instagram, with a circuit breaker for each
+    class of error that trips it. A tripped breaker stays open for an exponentially growing,
+    jittered delay and then lets a single probe request through, the breaker closes again once
+    a probe succeeds. The budget and breakers are saved to a json file to survive restarts.
+    """
+
+    def __init__(
+        self,
+        filename="governor.json",
+        rate=0.5,
+        capacity=20,
+        base_delay=300,
+        max_delay=6 * 3600,
+        jitter=0.25,
+        trip_on=(),
+    ):
+        """
+        Args:
+            filename (str, optional): File the state is saved to. Defaults to "governor.json".
+            rate (float, optional): Tokens added to the bucket per second. Defaults to 0.5.
+            capacity (int, optional): Maximum amount of tokens in the bucket. Defaults to 20.
+            base_delay (int, optional): Seconds a breaker stays open after its first failure.
+            Defaults to 300.
+            max_delay (int, optional): Upper bound of the delay in seconds. Defaults to 6 hours.
+            jitter (float, optional): Fraction the delay is randomly moved by. Defaults to 0.25.
+            trip_on (tuple, optional): Exception classes that trip a breaker in request.
+            Defaults to ().
+        """
+        self.filename = filename
+        self.rate = rate
+        self.capacity = capacity
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.trip_on = tuple(trip_on)
+        self.__lock = threading.Lock()
+        self.__tokens = float(capacity)
+        self.__updated = time.time()
+        self.__breakers = {}
+        self.load()
+
+    def __refill(self, now: float) -> None:
+        self.__tokens = min(
+            self.capacity, self.__tokens + (now - self.__updated) * self.rate
+        )
+        self.__updated = now
+
+    def __check(self, now: float) -> None:
+        # Raise for the first breaker that is open or already has a probe in flight
+        for key, breaker in self.__breakers.items():
+            if breaker["open_until"] > now:
+                raise CircuitOpenError(key, breaker["open_until"] - now)
+            if breaker["probing"]:
+                raise CircuitOpenError(key, 0)
+        for breaker in self.__breakers.values():
+            breaker["probing"] = True
+
+    def acquire(self, cost=1, timeout=None) -> bool:
+        """Blocks until the bucket holds enough tokens for a request
+
+        Args:
+            cost (int, optional): The amount of tokens the request takes. Defaults to 1.
+            timeout (float, optional): Seconds to wait before giving up. Defaults to None.
+
+        Raises:
+            CircuitOpenError: If a breaker is open
+
+        Returns:
+            bool: True if the tokens were taken, False if the timeout ran out
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self.__lock:
+                now = time.time()
+                self.__refill(now)
+                if self.__tokens >= cost:
+                    self.__check(now)
+                    self.__tokens -= cost
+                    return True
+                wait = (cost - self.__tokens) / self.rate
+            if deadline is not None:
+                if now >= deadline:
+                    return False
+                wait = min(wait, deadline - now)
+            time.sleep(wait)
+
+    def success(self) -> None:
+        """Closes the breakers whose probe request succeeded"""
+        with self.__lock:
+            closed = [k for k, b in self.__breakers.items() if b["probing"]]
+            for key in closed:
+                del self.__breakers[key]
+        if closed:
+            self.save()
+
+    def failure(self, key: str) -> float:
+        """Opens the breaker of the error class for an exponential delay and empties the bucket
+
+        Args:
+            key (str): The error class that occurred
+
+        Returns:
+            float: The seconds the breaker stays open for
+        """
+        with self.__lock:
+            breaker = self.__breakers.setdefault(
+                key, {"failures": 0, "open_until": 0.0, "probing": False}
+            )
+            breaker["failures"] += 1
+            delay = min(self.max_delay, self.base_delay * 2 ** (breaker["failures"] - 1))
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+            now = time.time()
+            breaker["open_until"] = now + delay
+            breaker["probing"] = False
+            self.__refill(now)
+            self.__tokens = 0.0
+        self.save()
+        return delay
+
+    @contextmanager
+    def request(self, cost=1):
+        """Acquires tokens for a block of requests and records whether the block succeeded,
+        the exceptions in trip_on open the breaker named after their class while any other
+        exception still counts as an answer from the server
+
+        Args:
+            cost (int, optional): The amount of tokens the block takes. Defaults to 1.
+        """
+        self.acquire(cost)
+        try:
+            yield
+        except self.trip_on as err:
+            self.failure(type(err).__name__)
+            raise
+        except Exception:
+            self.success()
+            raise
+        self.success()
+
+    def paged(self, items, page_length: int, charged=1):
+        """Yields the items of an iterator that fetches them a page at a time, the read that
+        starts each page is done inside request so the page is paid for and trips the breakers
+
+        Args:
+            items (Iterable): The items, fetched as they are read
+            page_length (int): The amount of items in a page
+            charged (int, optional): The pages already fetched and paid for by the caller.
+            Defaults to 1.
+        """
+        iterator = iter(items)
+        index = 0
+        while True:
+            if index % page_length == 0 and index // page_length >= charged:
+                with self.request():
+                    item = next(iterator, _END)
+            else:
+                item = next(iterator, _END)
+            if item is _END:
+                return
+            yield item
+            index += 1
+
+    def is_open(self, key=None) -> bool:
+        """Returns whether the breaker of the error class, or any breaker, is open"""
+        return self.retry_after(key) > 0
+
+    def retry_after(self, key=None) -> float:
+        """Returns the seconds left until the breaker of the error class, or every breaker, closes"""
+        now = time.time()
+        with self.__lock:
+            delays = [
+                b["open_until"] - now
+                for k, b in self.__breakers.items()
+                if key is None or k == key
+            ]
+        return max(delays + [0.0])
+
+    def reset(self) -> None:
+        """Closes every breaker and refills the bucket"""
+        with self.__lock:
+            self.__breakers.clear()
+            self.__tokens = float(self.capacity)
+            self.__updated = time.time()
+        self.save()
+
+    def state(self) -> dict:
+        """Returns the current budget and breakers
+
+        Returns:
+            dict: The tokens left, when they were counted and the breakers by error class
+        """
+        with self.__lock:
+            self.__refill(time.time())
+            return {
+                "tokens": self.__tokens,
+                "updated": self.__updated,
+                "breakers": {k: dict(b) for k, b in self.__breakers.items()},
+            }
+
+    def save(self) -> None:
+        """Writes the state to a temporary file and moves it over the saved one"""
+        state = self.state()
+        temp = f"{self.filename}.tmp"
+        with open(temp, "w") as fv:
+            json.dump(state, fv)
+        os.replace(temp, self.filename)
+
+    def load(self) -> None:
+        """Restores the state saved by a previous process, a probe in flight is not restored"""
+        try:
+            with open(self.filename, "r") as fv:
+                state = json.load(fv)
+        except (FileNotFoundError, ValueError):
+            return
+        with self.__lock:
+            self.__tokens = min(float(state["tokens"]), self.capacity)
+            self.__updated = state["updated"]
+            self.__breakers = {
+                k: dict(b, probing=False) for k, b in state["breakers"].items()
+            }
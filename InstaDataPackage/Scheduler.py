@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+import traceback
+
+
+class Scheduler:
+    """Keeps a bot loaded and runs its monitor_users pass on a resident thread every interval,
+    so the Instaloader session and the database connections stay warm between passes. Whether
+    it is running or paused is saved to the state store so a restarted process picks it up
+    """
+
+    __LOGGER = logging.getLogger()
+
+    def __init__(self, load_bot, interval=300, on_pass=None, store=None):
+        """
+        Args:
+            load_bot (Callable[[], Instabot]): Returns the bot, called once on first use
+            interval (int, optional): Seconds between the start of two passes. Defaults to 300.
+            on_pass (Callable[[], None], optional): Called after every pass. Defaults to None.
+            store (State_Store, optional): Saves whether the scheduler is running. Defaults to
+            None, nothing is saved.
+        """
+        self.interval = interval
+        self.on_pass = on_pass
+        self.store = store
+        self.passes = 0
+        self.last_pass = None
+        self.__load_bot = load_bot
+        self.__bot = None
+        self.__thread = None
+        self.__lock = threading.Lock()
+        self.__stopping = threading.Event()
+        self.__resumed = threading.Event()
+        self.__resumed.set()
+
+    @property
+    def bot(self):
+        """Instabot: The bot kept by the scheduler, loaded on first use"""
+        with self.__lock:
+            if self.__bot is None:
+                self.__bot = self.__load_bot()
+            return self.__bot
+
+    def is_loaded(self) -> bool:
+        return self.__bot is not None
+
+    def is_running(self) -> bool:
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def is_paused(self) -> bool:
+        return not self.__resumed.is_set()
+
+    def __save(self, state: str) -> None:
+        if self.store is not None:
+            self.store.set_setting("scheduler", state)
+
+    def start(self, paused=False) -> bool:
+        """Starts the thread running the passes
+
+        Args:
+            paused (bool, optional): Whether the passes are held back until resume is called.
+            Defaults to False.
+
+        Returns:
+            bool: False if the scheduler was already running
+        """
+        if self.is_running():
+            return False
+        self.__stopping.clear()
+        if paused:
+            self.__resumed.clear()
+        else:
+            self.__resumed.set()
+        self.__thread = threading.Thread(target=self.__run, name="Scheduler", daemon=True)
+        self.__thread.start()
+        self.__save("paused" if paused else "running")
+        Scheduler.__LOGGER.debug("Scheduler started")
+        return True
+
+    def restore(self) -> bool:
+        """Starts the scheduler again if it was running when the last process exited
+
+        Returns:
+            bool: True if the scheduler was started
+        """
+        state = self.store.setting("scheduler") if self.store is not None else None
+        if state not in ("running", "paused"):
+            return False
+        return self.start(paused=state == "paused")
+
+    def stop(self, timeout=None, save=True) -> None:
+        """Stops the scheduler once the pass in progress has finished
+
+        Args:
+            timeout (float, optional): Seconds to wait for the pass to finish. Defaults to None.
+            save (bool, optional): Whether the scheduler stays stopped in the next process,
+            False when the process itself is exiting. Defaults to True.
+        """
+        self.__stopping.set()
+        self.__resumed.set()
+        thread = self.__thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        if save:
+            self.__save("stopped")
+        Scheduler.__LOGGER.debug("Scheduler stopped")
+
+    def pause(self) -> None:
+        """Holds the passes back until resume is called, the pass in progress still finishes"""
+        self.__resumed.clear()
+        if self.is_running():
+            self.__save("paused")
+        Scheduler.__LOGGER.debug("Scheduler paused")
+
+    def resume(self) -> None:
+        self.__resumed.set()
+        if self.is_running():
+            self.__save("running")
+        Scheduler.__LOGGER.debug("Scheduler resumed")
+
+    def __run(self) -> None:
+        while not self.__stopping.is_set():
+            self.__resumed.wait()
+            if self.__stopping.is_set():
+                break
+            started = time.time()
+            try:
+                self.bot.monitor_users()
+            except Exception as _:
+                Scheduler.__LOGGER.error(traceback.format_exc())
+            self.passes += 1
+            self.last_pass = time.time()
+            if self.on_pass:
+                self.on_pass()
+            Scheduler.__LOGGER.debug(
+                f"Pass {self.passes} took {self.last_pass - started} seconds"
+            )
+            self.__stopping.wait(max(0, self.interval - (self.last_pass - started)))
@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+from sqlalchemy.engine import make_url
+
+from . import Storage
+
+STATE_URL = os.environ.get("STATE_DB_URL", "sqlite:///./bot_state.db")
+
+
+def state_version(url: str = STATE_URL) -> tuple:
+    """Returns the modification times of the state file and its write ahead log, which change
+    whenever a save is committed
+
+    Args:
+        url (str, optional): The url of the state database. Defaults to STATE_URL.
+
+    Returns:
+        tuple: The modification times in nanoseconds, 0 for a missing file
+    """
+    filename = make_url(url).database
+    version = []
+    for path in (filename, f"{filename}-wal"):
+        try:
+            version.append(os.stat(path).st_mtime_ns)
+        except (OSError, TypeError):
+            version.append(0)
+    return tuple(version)
+
+
+def _encode(value) -> str:
+    if isinstance(value, datetime):
+        return json.dumps({"datetime": value.isoformat()})
+    return json.dumps(value)
+
+
+def _decode(text: str):
+    value = json.loads(text)
+    if isinstance(value, dict) and "datetime" in value:
+        return datetime.fromisoformat(value["datetime"])
+    return value
+
+
+class State_Store:
+    """Keeps the state of the bot in SQLite tables, a save only writes the values and followees
+    that changed since the last save or load, inside a single transaction so a crash leaves
+    either the old or the new state
+    """
+
+    def __init__(self, url=STATE_URL):
+        """
+        Args:
+            url (str, optional): The url of the state database. Defaults to STATE_URL.
+        """
+        self.__url = url
+        self.__lock = threading.Lock()
+        self.__created = False
+        self.__values = {}
+        self.__followees = {}
+
+    def __create(self, cursor) -> None:
+        if not self.__created:
+            cursor.execute(
+                """CREATE TABLE IF NOT EXISTS bot_state(
+                name VARCHAR(30) PRIMARY KEY, value TEXT)"""
+            )
+            cursor.execute(
+                """CREATE TABLE IF NOT EXISTS settings(
+                name VARCHAR(30) PRIMARY KEY, value TEXT)"""
+            )
+            cursor.execute(
+                """CREATE TABLE IF NOT EXISTS followees(
+                username VARCHAR(30) PRIMARY KEY, position INTEGER, watermark TEXT,
+                cadence REAL, due REAL)"""
+            )
+            # Stores created before the schedule was saved are missing its columns
+            cursor.execute("PRAGMA table_info(followees)")
+            columns = {row[1] for row in cursor.fetchall()}
+            for column in ("cadence", "due"):
+                if column not in columns:
+                    cursor.execute(f"ALTER TABLE followees ADD COLUMN {column} REAL")
+            self.__created = True
+
+    def load(self):
+        """Loads the saved state and keeps it as the base the next save is compared to
+
+        Returns:
+            dict: The values by name, a list of the followees with their watermark in order and
+            the interval and due time of the followees scheduled, None if nothing has been saved
+        """
+        with self.__lock:
+            connection = Storage.connect(self.__url)
+            try:
+                cursor = connection.cursor()
+                self.__create(cursor)
+                cursor.execute("SELECT name, value FROM bot_state")
+                values = {name: _decode(value) for name, value in cursor.fetchall()}
+                cursor.execute(
+                    """SELECT username, position, watermark, cadence, due FROM followees
+                    ORDER BY position"""
+                )
+                rows = cursor.fetchall()
+                cursor.close()
+                connection.commit()
+            finally:
+                connection.close()
+            if not values:
+                return None
+            self.__values = {name: _encode(value) for name, value in values.items()}
+            self.__followees = {row[0]: tuple(row[1:]) for row in rows}
+            followees = [
+                (row[0], None if row[2] is None else _decode(row[2])) for row in rows
+            ]
+            schedule = {row[0]: (row[3], row[4]) for row in rows if row[3] is not None}
+            return {"values": values, "followees": followees, "schedule": schedule}
+
+    def setting(self, name: str, default=None):
+        """Returns a setting of the process running the bot, settings are kept apart from the
+        values of the bot
+
+        Args:
+            name (str): The name of the setting
+            default (optional): Returned when the setting was never set. Defaults to None.
+        """
+        with self.__lock:
+            connection = Storage.connect(self.__url)
+            try:
+                cursor = connection.cursor()
+                self.__create(cursor)
+                cursor.execute("SELECT value FROM settings WHERE name=?", (name,))
+                row = cursor.fetchone()
+                cursor.close()
+                connection.commit()
+            finally:
+                connection.close()
+        return default if row is None else _decode(row[0])
+
+    def set_setting(self, name: str, value) -> None:
+        with self.__lock:
+            connection = Storage.connect(self.__url)
+            try:
+                cursor = connection.cursor()
+                self.__create(cursor)
+                cursor.execute(
+                    """INSERT INTO settings VALUES(?, ?)
+                    ON CONFLICT(name) DO UPDATE SET value=excluded.value""",
+                    (name, _encode(value)),
+                )
+                cursor.close()
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                connection.close()
+
+    def save(self, values: dict, users, watermarks: dict, schedule=None) -> int:
+        """Writes the values and followees that changed since the last save
+
+        Args:
+            values (dict): The values of the bot by name
+            users (Iterable[str]): The followees in order
+            watermarks (dict): The date stamp of the latest post seen for each followee
+            schedule (dict, optional): The interval and due time of each followee.
+            Defaults to None.
+
+        Returns:
+            int: The number of rows written
+        """
+        with self.__lock:
+            changed_values = {}
+            for name, value in values.items():
+                encoded = _encode(value)
+                if self.__values.get(name) != encoded:
+                    changed_values[name] = encoded
+            schedule = schedule or {}
+            followees = {}
+            for position, user in enumerate(users):
+                watermark = watermarks.get(user)
+                followees[user] = (
+                    position,
+                    None if watermark is None else _encode(watermark),
+                    *schedule.get(user, (None, None)),
+                )
+            changed = [
+                (user, *row)
+                for user, row in followees.items()
+                if self.__followees.get(user) != row
+            ]
+            removed = [(user,) for user in self.__followees if user not in followees]
+            if not (changed_values or changed or removed):
+                return 0
+
+            connection = Storage.connect(self.__url)
+            try:
+                cursor = connection.cursor()
+                self.__create(cursor)
+                cursor.executemany(
+                    """INSERT INTO bot_state VALUES(?, ?)
+                    ON CONFLICT(name) DO UPDATE SET value=excluded.value""",
+                    list(changed_values.items()),
+                )
+                cursor.executemany(
+                    """INSERT INTO followees VALUES(?, ?, ?, ?, ?) ON CONFLICT(username)
+                    DO UPDATE SET position=excluded.position, watermark=excluded.watermark,
+                    cadence=excluded.cadence, due=excluded.due""",
+                    changed,
+                )
+                cursor.executemany("DELETE FROM followees WHERE username=?", removed)
+                cursor.close()
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                connection.close()
+            self.__values.update(changed_values)
+            self.__followees = followees
+            return len(changed_values) + len(changed) + len(removed)
@@ -1,4 +1,10 @@
 from .InstaData import Instabot
 
-bot = Instabot.load_bot()
 
+# Load the saved bot on first use rather than on import
+def __getattr__(name):
+    if name == "bot":
+        global bot
+        bot = Instabot.load_bot()
+        return bot
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,105 @@
+"""Simulates the followees posting at their own pace and compares how quickly new posts are
+found by a plain round robin Wheel and by the Cadence_Wheel for the same request budget
+
+Run from the root of the repository with python -m benchmarks.bench_schedule
+"""
+import argparse
+import bisect
+import random
+
+from InstaDataPackage.Cadence_Wheel import Cadence_Wheel
+from InstaDataPackage.Wheel_Linked import Wheel
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+
+def post_times(rng, users: int, duration: float) -> dict:
+    """Returns the post times of each user, the mean interval of a user is between an hour
+    and a year"""
+    posts = {}
+    for i in range(users):
+        interval = 10 ** rng.uniform(0, 3.94) * HOUR
+        times = []
+        t = rng.expovariate(1 / interval)
+        while t < duration:
+            times.append(t)
+            t += rng.expovariate(1 / interval)
+        posts[f"user_{i}"] = times
+    return posts
+
+
+class Detector:
+    """Counts the requests spent and the delay between each post and the poll finding it"""
+
+    def __init__(self, posts: dict):
+        self.posts = posts
+        self.found = {user: 0 for user in posts}
+        self.requests = 0
+        self.latency = 0.0
+        self.detected = 0
+
+    def poll(self, user: str, now: float):
+        times = self.posts[user]
+        latest = bisect.bisect_right(times, now)
+        self.requests += 1
+        for t in times[self.found[user] : latest]:
+            self.latency += now - t
+            self.detected += 1
+        self.found[user] = latest
+        # The profile fetched by a poll also gives the amount of posts
+        return (times[latest - 1] if latest else None), latest
+
+
+def round_robin(posts: dict, duration: float, interval: float, budget: int) -> Detector:
+    detector = Detector(posts)
+    wheel = Wheel()
+    for user in posts:
+        wheel.add(user)
+    wheel.get_next()
+    now = 0.0
+    while now < duration:
+        for _ in range(budget):
+            detector.poll(wheel.peek(), now)
+            wheel.get_next()
+        now += interval
+    return detector
+
+
+def cadence(posts: dict, duration: float, interval: float, budget: int) -> Detector:
+    detector = Detector(posts)
+    wheel = Cadence_Wheel(min_interval=interval)
+    for user in posts:
+        wheel.add(user)
+    now = 0.0
+    while now < duration:
+        for user in wheel.due(now, budget):
+            post, count = detector.poll(user, now)
+            wheel.checked(user, now, post, count)
+        now += interval
+    return detector
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--interval", type=float, default=300, help="seconds between passes")
+    parser.add_argument("--budget", type=int, default=10, help="requests per pass")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    duration = args.days * DAY
+    posts = post_times(random.Random(args.seed), args.users, duration)
+    print(f"{args.users} users, {sum(map(len, posts.values()))} posts, {args.budget} requests per pass")
+    print(f"{'':14}{'requests':>10}{'posts found':>13}{'latency (h)':>13}{'found/1k req':>14}")
+    for name, run in (("round robin", round_robin), ("cadence", cadence)):
+        detector = run(posts, duration, args.interval, args.budget)
+        latency = detector.latency / max(detector.detected, 1) / HOUR
+        print(
+            f"{name:14}{detector.requests:>10}{detector.detected:>13}{latency:>13.2f}"
+            f"{detector.detected / detector.requests * 1000:>14.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Compares Array_List with Linked_List on the operations the bot uses on its followees
+
+Run from the root of the repository with python -m benchmarks.bench_users
+"""
+import argparse
+import timeit
+import tracemalloc
+
+from InstaDataPackage.Array_List import Array_List
+from InstaDataPackage.Linked_List import Linked_List
+
+
+def build(cls, names: list):
+    users = cls()
+    for name in names:
+        users.append(name)
+    return users
+
+
+def footprint(cls, names: list) -> int:
+    """Returns the bytes allocated to hold the names, not counting the strings"""
+    tracemalloc.start()
+    users = build(cls, names)
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del users
+    return allocated
+
+
+def measure(cls, size: int, repeat: int) -> dict:
+    names = [f"user_{i}" for i in range(size)]
+    users = build(cls, names)
+
+    def per_call(func, number, unit):
+        return timeit.timeit(func, number=number) / number * unit
+
+    return {
+        "append all (ms)": per_call(lambda: build(cls, names), 10, 1e3),
+        "iterate (ms)": per_call(lambda: list(users), repeat, 1e3),
+        "index middle (us)": per_call(lambda: users[size // 2], repeat, 1e6),
+        "contains last (us)": per_call(lambda: names[-1] in users, repeat, 1e6),
+        "str (ms)": per_call(lambda: str(users), 10, 1e3),
+        "memory (KiB)": footprint(cls, names) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    linked = measure(Linked_List, args.size, args.repeat)
+    array = measure(Array_List, args.size, args.repeat)
+    print(f"{args.size} users{'':14}{'Linked_List':>14}{'Array_List':>14}")
+    for name in linked:
+        print(f"{name:24}{linked[name]:>14.2f}{array[name]:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
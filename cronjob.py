@@ -1,5 +1,25 @@
-from InstaDataPackage import bot
+import os
+import signal
+import sys
+import time
+
+from InstaDataPackage import Instabot
+from InstaDataPackage.Scheduler import Scheduler
 
 if __name__ == "__main__":
-    bot.monitor_users()
+    # python3 cronjob.py --daemon keeps the bot resident instead of running a single pass
+    if "--daemon" in sys.argv:
+        scheduler = Scheduler(
+            Instabot.load_bot, interval=int(os.environ.get("SCRAPE_INTERVAL", 300))
+        )
+        signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+        scheduler.start()
+        try:
+            while scheduler.is_running():
+                time.sleep(1)
+        except KeyboardInterrupt:
+            scheduler.stop()
+    else:
+        from InstaDataPackage import bot
 
+        bot.monitor_users()
@@ -0,0 +1,51 @@
+"""Fixtures shared by the tests of the local database"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from InstaDataPackage.Instabase import DB_Session_Local
+
+# Columns of the accounts table, also used by the insta_train table of the server
+ACCOUNTS = """(username VARCHAR(30) PRIMARY KEY, posts INT, followers INT, following INT,
+    private BOOLEAN, bio_tag BOOLEAN, external_url BOOLEAN, verified BOOLEAN)"""
+
+
+def create_accounts(path: str, table="accounts", rows=()) -> str:
+    """Creates a table of accounts in a sqlite file, the rows are inserted as they are so they
+    have no entry in the feature cache
+
+    Args:
+        path (str): The sqlite file
+        table (str, optional): The name of the table. Defaults to "accounts".
+        rows (Iterable[tuple], optional): The rows inserted. Defaults to ().
+
+    Returns:
+        str: The url of the database
+    """
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute(f"CREATE TABLE {table} {ACCOUNTS}")
+        connection.executemany(f"INSERT INTO {table} VALUES(?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    connection.close()
+    return f"sqlite:///{path}"
+
+
+class LocalDatabaseTest(unittest.TestCase):
+    """Gives each test an accounts table holding ROWS in a temporary directory"""
+
+    # Rows inserted as they are when the table is created
+    ROWS = ()
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "instabase.db")
+        self.url = create_accounts(self.path, rows=self.ROWS)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def insert(self, rows) -> int:
+        """Writes the rows through DB_Session_Local like the scraper does"""
+        with DB_Session_Local(self.url) as db:
+            return db.insert_many(rows)
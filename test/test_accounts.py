@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from App_Package.app import app, get_db, stream_accounts
+from App_Package.auth import tokens
+from InstaDataPackage import Storage
+from .helpers import LocalDatabaseTest
+
+
+class TestAccounts(LocalDatabaseTest):
+    def setUp(self):
+        super().setUp()
+        self.rows = [(f"user_{i}", i, i, i, 0, 1, 0, 1, i / 10) for i in range(4)]
+        self.insert(self.rows)
+        engine = Storage.get_engine(self.url)
+        session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def get_test_db():
+            db = session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = get_test_db
+        self.engine = mock.patch("App_Package.app.engine", engine)
+        self.engine.start()
+        self.client = TestClient(app)
+        self.headers = {"Authorization": f"Bearer {tokens.issue('admin')}"}
+
+    def tearDown(self):
+        self.engine.stop()
+        app.dependency_overrides.clear()
+        super().tearDown()
+
+    def page(self, **params) -> dict:
+        response = self.client.get("/accounts", params=params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_requires_token(self):
+        self.assertEqual(self.client.get("/accounts").status_code, 401)
+        self.assertEqual(self.client.get("/accounts/export").status_code, 401)
+
+    def test_pages(self):
+        first = self.page(limit=3)
+        self.assertEqual(
+            [a["username"] for a in first["accounts"]], ["user_0", "user_1", "user_2"]
+        )
+        self.assertEqual(first["next"], "user_2")
+        self.assertEqual(first["accounts"][1]["bot_score"], 0.1)
+        last = self.page(after=first["next"], limit=3)
+        self.assertEqual([a["username"] for a in last["accounts"]], ["user_3"])
+        self.assertIsNone(last["next"])
+
+    def test_page_boundary(self):
+        # A page filled to the limit cannot tell it is the last one, the next page is empty
+        first = self.page(limit=2)
+        second = self.page(after=first["next"], limit=2)
+        self.assertEqual([a["username"] for a in second["accounts"]], ["user_2", "user_3"])
+        self.assertEqual(second["next"], "user_3")
+        self.assertEqual(
+            self.page(after=second["next"], limit=2),
+            {"code": "success", "accounts": [], "next": None},
+        )
+
+    def test_export_csv(self):
+        response = self.client.get("/accounts/export", headers=self.headers)
+        self.assertEqual(response.headers["content-type"].split(";")[0], "text/csv")
+        rows = list(csv.reader(io.StringIO(response.text)))
+        self.assertEqual(rows[0][0], "username")
+        self.assertEqual([row[0] for row in rows[1:]], [row[0] for row in self.rows])
+
+    def test_export_ndjson(self):
+        response = self.client.get(
+            "/accounts/export", params={"fmt": "ndjson"}, headers=self.headers
+        )
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        accounts = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual([a["username"] for a in accounts], [row[0] for row in self.rows])
+        self.assertEqual(accounts[3]["posts"], 3)
+
+    def test_stream_chunks(self):
+        # Each chunk read from the cursor is sent as its own piece of the body
+        chunks = list(stream_accounts("ndjson", chunk_size=3))
+        self.assertEqual([chunk.count("\n") for chunk in chunks], [3, 1])
+        chunks = list(stream_accounts("csv", chunk_size=3))
+        self.assertEqual(chunks[0].splitlines()[0].split(",")[0], "username")
+        self.assertEqual("".join(chunks).count("\n"), 5)
+
+    def test_export_format(self):
+        response = self.client.get(
+            "/accounts/export", params={"fmt": "xml"}, headers=self.headers
+        )
+        self.assertEqual(response.json()["code"], "failed")
@@ -11,11 +11,50 @@ class TestApp(unittest.TestCase):
             "password": os.environ["password"],
         }
         response = requests.post(
-            url=f"http://{os.environ.get('ip')}:{os.environ.get('port')}/status",
+            url=f"http://{os.environ.get('ip')}:{os.environ.get('port')}/login",
             json=json_data,
         )
-        if response.json()["code"] == "fail":
-            self.fail("Unable to get status")
+        if response.json()["code"] == "failed":
+            self.fail("Unable to log in")
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+        # The token is reused by every poll
+        for _ in range(3):
+            response = requests.post(
+                url=f"http://{os.environ.get('ip')}:{os.environ.get('port')}/status",
+                headers=headers,
+            )
+            if response.json()["code"] == "failed":
+                self.fail("Unable to get status")
+
+    def test_invalid_token(self):
+        response = requests.post(
+            url=f"http://{os.environ.get('ip')}:{os.environ.get('port')}/status",
+            headers={"Authorization": "Bearer invalid"},
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_predict_requires_token(self):
+        response = requests.post(
+            url=f"http://{os.environ.get('ip')}:{os.environ.get('port')}/predict",
+            json={"usernames": ["instagram"]},
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_accounts(self):
+        response = requests.post(
+            url=f"http://{os.environ.get('ip')}:{os.environ.get('port')}/login",
+            json={"username": os.environ["username"], "password": os.environ["password"]},
+        )
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+        url = f"http://{os.environ.get('ip')}:{os.environ.get('port')}/accounts"
+        self.assertEqual(requests.get(url=url).status_code, 401)
+        first = requests.get(url=url, params={"limit": 2}, headers=headers).json()
+        self.assertLessEqual(len(first["accounts"]), 2)
+        if first["next"] is not None:
+            second = requests.get(
+                url=url, params={"after": first["next"], "limit": 2}, headers=headers
+            ).json()
+            self.assertGreater(second["accounts"][0]["username"], first["next"])
 
     def test_add_user(self):
         json_data = {
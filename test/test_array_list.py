@@ -0,0 +1,46 @@
+import pickle
+import unittest
+
+from InstaDataPackage.Array_List import Array_List
+from InstaDataPackage.Linked_List import Linked_List
+
+
+class TestArrayList(unittest.TestCase):
+    def setUp(self):
+        self.users = Array_List()
+        for i in range(5):
+            self.users.append(f"user_{i}")
+
+    def test_matches_linked_list(self):
+        linked = Linked_List()
+        for i in range(5):
+            linked.append(f"user_{i}")
+        linked.prepend("first")
+        self.users.prepend("first")
+        self.assertEqual(list(self.users), list(linked))
+        self.assertEqual(str(self.users), str(linked))
+        self.assertEqual(self.users[-1], linked[-1])
+        self.assertEqual(len(self.users), len(linked))
+
+    def test_membership(self):
+        self.assertIn("user_3", self.users)
+        self.users[3] = "other"
+        self.assertNotIn("user_3", self.users)
+        self.assertIn("other", self.users)
+        self.assertEqual(self.users.peek(), "user_0")
+
+    def test_clear(self):
+        self.users.clear()
+        self.assertTrue(self.users.is_empty())
+        self.assertIsNone(self.users.peek())
+        self.users.append("user_9")
+        self.assertEqual(len(self.users), 1)
+        self.assertEqual(pickle.loads(pickle.dumps(self.users))[0], "user_9")
+
+    def test_linked_list_clear(self):
+        linked = Linked_List()
+        linked.append("user_0")
+        linked.clear()
+        linked.append("user_1")
+        self.assertEqual(len(linked), 1)
+        self.assertEqual(str(linked), "user_1-->")
@@ -0,0 +1,54 @@
+import unittest
+from unittest import mock
+
+from App_Package.auth import (
+    AuthError,
+    TokenCache,
+    authorize,
+    hash_password,
+    is_hashed,
+    verify_password,
+)
+
+
+class TestPasswords(unittest.TestCase):
+    def test_hashed(self):
+        stored = hash_password("secret")
+        self.assertTrue(is_hashed(stored))
+        self.assertTrue(verify_password("secret", stored))
+        self.assertFalse(verify_password("wrong", stored))
+        self.assertNotEqual(hash_password("secret"), stored)
+
+    def test_plaintext(self):
+        self.assertFalse(is_hashed("secret"))
+        self.assertTrue(verify_password("secret", "secret"))
+        self.assertFalse(verify_password("wrong", "secret"))
+
+
+class TestTokens(unittest.TestCase):
+    def test_issue_verify(self):
+        cache = TokenCache()
+        token = cache.issue("admin")
+        self.assertEqual(cache.verify(token), "admin")
+        # Signed by another worker sharing the key
+        self.assertEqual(TokenCache().verify(token), "admin")
+
+    def test_expired(self):
+        cache = TokenCache()
+        token = cache.issue("admin", ttl=-1)
+        self.assertIsNone(cache.verify(token))
+        self.assertIsNone(TokenCache().verify(token))
+
+    def test_invalid(self):
+        cache = TokenCache()
+        payload = cache.issue("admin").split(".")[0]
+        for token in ("", "invalid", f"{payload}.forged", f"{payload}.é", "é.é", "a.b.c"):
+            self.assertIsNone(TokenCache().verify(token), token)
+
+    def test_authorize(self):
+        cache = TokenCache()
+        with mock.patch("App_Package.auth.tokens", cache):
+            self.assertEqual(authorize(f"Bearer {cache.issue('admin')}"), "admin")
+            for header in (None, "Basic abc", "Bearer é"):
+                with self.assertRaises(AuthError):
+                    authorize(header)
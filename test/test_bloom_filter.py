@@ -0,0 +1,32 @@
+import os
+import tempfile
+import unittest
+
+from InstaDataPackage.Bloom_Filter import Bloom_Filter
+
+
+class TestBloomFilter(unittest.TestCase):
+    def setUp(self):
+        self.bloom = Bloom_Filter(capacity=10000, error_rate=0.01)
+        self.bloom.update(f"user_{i}" for i in range(10000))
+
+    def test_added(self):
+        for i in range(10000):
+            self.assertIn(f"user_{i}", self.bloom)
+        self.assertFalse(self.bloom.add("user_0"))
+        # Items wrongly found when added are not counted
+        self.assertGreater(self.bloom.count, 9800)
+
+    def test_error_rate(self):
+        wrong = sum(f"other_{i}" in self.bloom for i in range(10000))
+        self.assertLess(wrong / 10000, 0.02)
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "seen.bloom")
+            self.bloom.save(filename)
+            loaded = Bloom_Filter.load(filename)
+            self.assertIsNone(Bloom_Filter.load(os.path.join(directory, "missing")))
+        self.assertEqual(loaded.count, self.bloom.count)
+        self.assertIn("user_42", loaded)
+        self.assertNotIn("user_42", Bloom_Filter(capacity=10, error_rate=0.01))
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+
+from InstaDataPackage.Bot_Predictor import Bot_Predictor
+from InstaDataPackage.Bot_Scorer import Bot_Scorer
+from InstaDataPackage.Feature_Store import Feature_Store
+from InstaDataPackage.Instabase import DB_Session, DB_Session_Local
+from .helpers import LocalDatabaseTest, create_accounts
+
+
+class TestBotPredictor(LocalDatabaseTest):
+    def setUp(self):
+        super().setUp()
+        self.model = os.path.join(self.directory.name, "bot_model.npy")
+        self.rows = [
+            (f"user_{i}", i % 50, 10 * i, 3000 - i, i % 2, i % 3 == 0, i % 5 == 0, 0)
+            for i in range(2000)
+        ]
+        self.insert(self.rows)
+        self.scorer = Bot_Scorer(self.model, clusters=3)
+        self.scorer.score_rows(self.rows)
+        self.scorer.save()
+
+    def test_no_model(self):
+        predictor = Bot_Predictor(os.path.join(self.directory.name, "none.npy"), self.url)
+        self.assertIsNone(predictor.predict_rows([[1] * 7]))
+        self.assertEqual(predictor.predict_users(["user_1"]), (None, ["user_1"]))
+
+    def test_predict_users(self):
+        predictor = Bot_Predictor(self.model, self.url)
+        users = [f"user_{i}" for i in range(1500)] + ["unknown"]
+        scores, missing = predictor.predict_users(users)
+        self.assertEqual(missing, ["unknown"])
+        self.assertEqual(len(scores), 1500)
+        samples = np.array([row[1:] for row in self.rows[:1500]], dtype="float64")
+        np.testing.assert_allclose(list(scores.values()), self.scorer.score(samples))
+        # Scored again from the cache
+        self.assertEqual(predictor.predict_users(users[:10])[0], dict(list(scores.items())[:10]))
+        self.assertEqual(predictor.stats()["hits"], 10)
+
+    def test_predict_rows(self):
+        predictor = Bot_Predictor(self.model, self.url)
+        samples = [row[1:] for row in self.rows[:5]]
+        np.testing.assert_allclose(predictor.predict_rows(samples), self.scorer.score(samples))
+        self.assertEqual(predictor.predict_rows([]), [])
+
+    def test_reload(self):
+        predictor = Bot_Predictor(self.model, self.url, cache_size=100)
+        predictor.predict_users([f"user_{i}" for i in range(200)])
+        self.assertEqual(predictor.stats()["cached"], 100)
+        scorer = Bot_Scorer(self.model, clusters=3)
+        scorer.score_rows([(f"new_{i}", 0, 0, 7500, 0, 0, 0, 0) for i in range(500)])
+        scorer.save()
+        os.utime(self.model, ns=(0, 0))
+        predictor.model()
+        self.assertEqual(predictor.stats()["cached"], 0)
+        samples = [row[1:] for row in self.rows[:5]]
+        np.testing.assert_allclose(predictor.predict_rows(samples), scorer.score(samples))
+
+    def test_after_transfer(self):
+        store = Feature_Store(os.path.join(self.directory.name, "store"), self.url, settle=0)
+        store.build()
+        server = create_accounts(os.path.join(self.directory.name, "server.db"), "insta_train")
+        with DB_Session_Local(self.url) as db:
+            db.transfer_to_server(server=DB_Session(server))
+            self.assertEqual(db.show(), [])
+        predictor = Bot_Predictor(self.model, self.url, store=store)
+        users = ["user_3", "user_1999", "unknown"]
+        scores, missing = predictor.predict_users(users)
+        self.assertEqual(missing, ["unknown"])
+        samples = np.array([self.rows[3][1:], self.rows[1999][1:]], dtype="float64")
+        np.testing.assert_allclose(
+            [scores["user_3"], scores["user_1999"]], self.scorer.score(samples)
+        )
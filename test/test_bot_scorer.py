@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+
+from InstaDataPackage.Bot_Scorer import Bot_Scorer
+from InstaDataPackage.Instabase import DB_Session_Local
+from .helpers import create_accounts
+
+
+def rows(start: int, amount: int) -> list:
+    # Alternates accounts that look genuine with accounts that follow many and post nothing
+    return [
+        (f"user_{i}", 200 + i, 5000 + i, 300, 0, 1, 1, i % 7 == 0)
+        if i % 2
+        else (f"user_{i}", 0, 3, 4000 + i, 0, 0, 0, 0)
+        for i in range(start, start + amount)
+    ]
+
+
+class TestBotScorer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.model = os.path.join(self.directory.name, "bot_model.npy")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_unfitted(self):
+        scorer = Bot_Scorer(self.model, clusters=4)
+        self.assertIsNone(scorer.score(np.ones((2, 7))))
+        scored = scorer.score_rows([("user", 1, 1, 1, 0, 0, 0, 0)])
+        self.assertEqual(scored, [("user", 1, 1, 1, 0, 0, 0, 0, None)])
+
+    def test_score_rows(self):
+        scorer = Bot_Scorer(self.model, clusters=2)
+        for start in range(0, 200, 20):
+            scored = scorer.score_rows(rows(start, 20))
+        self.assertTrue(scorer.is_fitted())
+        scores = [row[-1] for row in scored]
+        self.assertTrue(all(0 <= score <= 1 for score in scores))
+        # The accounts following thousands with no posts score higher
+        self.assertGreater(min(scores[0::2]), max(scores[1::2]))
+
+    def test_save_load(self):
+        scorer = Bot_Scorer(self.model, clusters=2)
+        scorer.score_rows(rows(0, 40))
+        scorer.save()
+        loaded = Bot_Scorer(self.model, clusters=2)
+        samples = np.array([row[1:] for row in rows(40, 10)], dtype="float64")
+        np.testing.assert_allclose(loaded.score(samples), scorer.score(samples))
+        self.assertFalse(Bot_Scorer(self.model, clusters=3).is_fitted())
+
+    def test_insert_scored(self):
+        path = os.path.join(self.directory.name, "instabase.db")
+        url = create_accounts(path, rows=[("old", 1, 1, 1, 0, 0, 0, 0)])
+        scored = Bot_Scorer(self.model, clusters=2).score_rows(rows(0, 10))
+        with DB_Session_Local(url) as db:
+            self.assertEqual(db.insert_many(scored), 10)
+            self.assertEqual(len(db.show()[0]), 8)
+            # Scraped again before a model is fitted, the score is kept
+            db.insert_many([("user_0", 5, 5, 5, 0, 0, 0, 0, None)])
+        with sqlite3.connect(path) as connection:
+            stored = dict(connection.execute("SELECT username, bot_score FROM accounts"))
+        self.assertIsNone(stored["old"])
+        self.assertAlmostEqual(stored["user_0"], scored[0][-1])
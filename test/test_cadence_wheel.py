@@ -0,0 +1,65 @@
+import threading
+import unittest
+
+from InstaDataPackage.Cadence_Wheel import Cadence_Wheel
+
+HOUR = 3600.0
+
+
+class TestCadenceWheel(unittest.TestCase):
+    def setUp(self):
+        self.wheel = Cadence_Wheel(min_interval=300, max_interval=24 * HOUR)
+        for user in ("often", "rarely", "new"):
+            self.wheel.add(user)
+
+    def test_new_users_due(self):
+        self.assertEqual(self.wheel.due(0), ["often", "rarely", "new"])
+        self.assertEqual(self.wheel.due(0, limit=2), ["often", "rarely"])
+        self.assertEqual(len(self.wheel), 3)
+
+    def test_frequent_posters_first(self):
+        now = 0.0
+        for check in range(48):
+            self.wheel.checked("often", now, count=check)
+            self.wheel.checked("rarely", now, count=0)
+            now += HOUR
+        often, rarely = self.wheel.state()["often"], self.wheel.state()["rarely"]
+        self.assertLess(often[0], rarely[0])
+        self.assertLess(often[1], rarely[1])
+        self.assertLessEqual(rarely[1], now - HOUR + 24 * HOUR)
+
+    def test_remove(self):
+        self.wheel.checked("often", 0, count=1)
+        self.assertEqual(self.wheel.remove("new"), "new")
+        self.assertIsNone(self.wheel.remove("new"))
+        self.assertNotIn("new", self.wheel)
+        self.assertEqual(self.wheel.peek(), "rarely")
+        self.assertEqual(self.wheel.due(0), ["rarely"])
+
+    def test_concurrent_peek(self):
+        wheel = Cadence_Wheel()
+        for i in range(200):
+            wheel.add(f"user_{i}")
+        stop = threading.Event()
+
+        def poll():
+            while not stop.is_set():
+                wheel.peek()
+
+        pollers = [threading.Thread(target=poll) for _ in range(4)]
+        for thread in pollers:
+            thread.start()
+        try:
+            for check in range(20):
+                for user in wheel.due(float(check), limit=50):
+                    wheel.checked(user, float(check), count=check)
+                    wheel.remove(f"user_{check}")
+        finally:
+            stop.set()
+            for thread in pollers:
+                thread.join()
+        # The heap still pops the users in the order of their due time
+        due = wheel.due(float("inf"))
+        state = wheel.state()
+        self.assertEqual(len(due), len(wheel))
+        self.assertEqual([state[user][1] for user in due], sorted(s[1] for s in state.values()))
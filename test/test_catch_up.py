@@ -0,0 +1,173 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from InstaDataPackage.Array_List import Array_List
+from InstaDataPackage.Bloom_Filter import Bloom_Filter
+from InstaDataPackage.Bot_Scorer import Bot_Scorer
+from InstaDataPackage.Feature_Cache import Feature_Cache
+from InstaDataPackage.Feature_Store import Feature_Store
+from InstaDataPackage.InstaData import Instabot
+from InstaDataPackage.Rate_Limit import CircuitOpenError, Governor
+from InstaDataPackage.State_Store import State_Store
+from .helpers import create_accounts
+
+
+def post(day, pinned=False):
+    return mock.Mock(
+        date_utc=datetime(2020, 1, day),
+        is_pinned=pinned,
+        owner_profile=mock.Mock(mediacount=day),
+        get_comments=mock.Mock(return_value=iter([day])),
+    )
+
+
+class TestCatchUp(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.patches = [
+            mock.patch.object(
+                Instabot,
+                "_Instabot__STORE",
+                State_Store(f"sqlite:///{os.path.join(self.directory.name, 'bot_state.db')}"),
+            ),
+            mock.patch.object(
+                Instabot,
+                "_Instabot__GOVERNOR",
+                Governor(os.path.join(self.directory.name, "governor.json"), capacity=1000),
+            ),
+            mock.patch.object(Instabot, "_Instabot__NOTIFICATION"),
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.bot = Instabot.__new__(Instabot)
+        self.bot.users = Array_List(["user_0"])
+        self.bot.watermarks = {"user_0": datetime(2020, 1, 3)}
+        self.bot.schedule = Instabot.new_schedule(self.bot.users, self.bot.watermarks)
+        self.bot.date_stamp = datetime(2020, 1, 3)
+        self.bot.cooldown = False
+        self.bot.stop_date = None
+        # An old pinned post comes first, then the posts newest first
+        self.posts = [post(1, pinned=True), post(6), post(5), post(4), post(3), post(2)]
+        self.bot.get_profile = mock.Mock(
+            return_value=mock.Mock(get_posts=lambda: iter(self.posts))
+        )
+        self.harvested = []
+        self.bot.commenters = self.commenters
+
+    def commenters(self, comments):
+        self.harvested.extend(comments)
+        return {"stopped": False}
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.directory.cleanup()
+
+    def test_walks_back_to_watermark(self):
+        user, outcome, (latest, posts) = self.bot.poll_user("user_0")
+        self.assertEqual(outcome, "post")
+        self.assertIs(latest, self.posts[1])
+        self.assertEqual([p.date_utc.day for p in posts], [4, 5, 6])
+
+    def test_catch_up_oldest_first(self):
+        with mock.patch.object(Instabot, "CATCH_UP", 2):
+            self.bot.merge_result(self.bot.poll_user("user_0"))
+            self.assertEqual(sorted(self.harvested), [4, 5])
+            self.assertEqual(self.bot.watermarks["user_0"], datetime(2020, 1, 5))
+            # The posts left over are picked up by the next poll
+            self.bot.merge_result(self.bot.poll_user("user_0"))
+        self.assertEqual(sorted(self.harvested), [4, 5, 6])
+        self.assertEqual(self.bot.watermarks["user_0"], datetime(2020, 1, 6))
+
+    def test_harvests_each_post_once(self):
+        self.bot.merge_result(self.bot.poll_user("user_0"))
+        self.assertEqual(sorted(self.harvested), [4, 5, 6])
+        self.assertEqual(self.bot.watermarks["user_0"], datetime(2020, 1, 6))
+        self.harvested.clear()
+        self.bot.merge_result(self.bot.poll_user("user_0"))
+        self.assertEqual(self.harvested, [])
+
+    def test_stopped_pipeline_holds_watermark(self):
+        for p in self.posts:
+            owner = mock.Mock(username=f"commenter_{p.date_utc.day}")
+            p.get_comments = mock.Mock(return_value=iter([mock.Mock(owner=owner)]))
+
+        def extract_data(owner):
+            if owner.username == "commenter_5":
+                raise CircuitOpenError("profile", 60)
+            return (owner.username, 1, 1, 1, 0, 0, 0, 0)
+
+        written = []
+        del self.bot.commenters
+        self.bot.extract_data = extract_data
+        with mock.patch.object(
+            Instabot, "_Instabot__write_commenters", staticmethod(written.extend)
+        ), mock.patch.object(
+            Instabot, "_Instabot__select_commenters", staticmethod(list)
+        ), mock.patch.object(
+            Instabot, "_Instabot__SEEN", Bloom_Filter(100)
+        ), mock.patch.object(
+            Instabot, "_Instabot__SEEN_FILE", os.path.join(self.directory.name, "seen.bloom")
+        ):
+            self.bot.merge_result(self.bot.poll_user("user_0"))
+        self.assertIn(("commenter_4", 1, 1, 1, 0, 0, 0, 0), written)
+        # The filter is saved once per pass rather than by each post
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, "seen.bloom")))
+        self.assertEqual(self.bot.watermarks["user_0"], datetime(2020, 1, 4))
+
+    def test_failed_harvest_holds_watermark(self):
+        def commenters(comments):
+            day = next(comments)
+            if day == 5:
+                raise RuntimeError("failed")
+            return {"stopped": False}
+
+        self.bot.commenters = commenters
+        self.bot.merge_result(self.bot.poll_user("user_0"))
+        self.assertEqual(self.bot.watermarks["user_0"], datetime(2020, 1, 4))
+
+    def test_failed_harvest_cancels_later_posts(self):
+        def commenters(comments):
+            day = next(comments)
+            if day == 4:
+                raise RuntimeError("failed")
+            # Holds the only worker until the posts after it are cancelled
+            time.sleep(0.2)
+            return {"stopped": False}
+
+        self.bot.commenters = commenters
+        with mock.patch.object(Instabot, "POST_WORKERS", 1):
+            self.bot.merge_result(self.bot.poll_user("user_0"))
+        self.assertEqual(self.bot.watermarks["user_0"], datetime(2020, 1, 3))
+        # The comments of a cancelled post are never fetched
+        self.posts[1].get_comments.assert_not_called()
+
+    def test_monitor_pass(self):
+        url = create_accounts(
+            os.path.join(self.directory.name, "instabase.db"),
+            rows=[("user_1", 1, 1, 1, 0, 0, 0, 0)],
+        )
+        store = Feature_Store(os.path.join(self.directory.name, "store"), url, settle=0)
+        scorer = Bot_Scorer(os.path.join(self.directory.name, "bot_model.npy"))
+        seen = os.path.join(self.directory.name, "seen.bloom")
+        with mock.patch.object(Instabot, "_Instabot__FEATURE_STORE", store), mock.patch.object(
+            Instabot, "_Instabot__FEATURES", Feature_Cache(url)
+        ), mock.patch.object(Instabot, "_Instabot__SCORER", scorer), mock.patch.object(
+            Instabot, "_Instabot__SEEN", Bloom_Filter(100)
+        ), mock.patch.object(Instabot, "_Instabot__SEEN_FILE", seen):
+            Instabot.seen().add("user_1")
+            self.bot.monitor_users(max_workers=1)
+            self.assertIs(Instabot.store(), store)
+            self.assertEqual(Instabot.store().stats()["rows"], 1)
+        self.assertIn("user_1", Bloom_Filter.load(seen))
+        self.assertEqual(sorted(self.harvested), [4, 5, 6])
+
+    def test_new_user_sets_watermark(self):
+        del self.bot.watermarks["user_0"]
+        self.bot.merge_result(self.bot.poll_user("user_0"))
+        self.assertEqual(self.bot.watermarks["user_0"], datetime(2020, 1, 6))
+        self.assertEqual(self.harvested, [])
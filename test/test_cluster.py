@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from InstaDataPackage import InstaCluster
+from InstaDataPackage.Feature_Store import Feature_Store
+from .helpers import create_accounts
+
+
+class TestCluster(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.rows = [(f"user_{i}", i, i * 10, i + 1, i % 2, 0, 1, 0) for i in range(250)]
+        self.csv = os.path.join(self.directory.name, "InstaData.csv")
+        with open(self.csv, "w") as fv:
+            for row in self.rows:
+                fv.write(",".join(map(str, row)) + "\n")
+        self.expected = np.array([row[1:] for row in self.rows], dtype="float64")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_load_csv(self):
+        usernames, samples = InstaCluster.load_csv(self.csv, chunk_size=40)
+        self.assertEqual(list(usernames[:2]), ["user_0", "user_1"])
+        np.testing.assert_array_equal(samples, self.expected)
+        cached = InstaCluster.load_csv(self.csv)[1]
+        self.assertIsInstance(cached, np.memmap)
+        np.testing.assert_array_equal(cached, self.expected)
+        np.testing.assert_array_equal(InstaCluster.convert_csv(self.csv), self.expected)
+
+    def test_load_table(self):
+        url = create_accounts(os.path.join(self.directory.name, "instabase.db"), rows=self.rows)
+        usernames, samples = InstaCluster.load_table(url, chunk_size=64)
+        self.assertEqual(len(usernames), 250)
+        np.testing.assert_array_equal(samples, self.expected)
+        np.testing.assert_array_equal(InstaCluster.load_rows(self.rows)[1], self.expected)
+
+    def test_load_store(self):
+        url = create_accounts(os.path.join(self.directory.name, "instabase.db"), rows=self.rows)
+        directory = os.path.join(self.directory.name, "store")
+        Feature_Store(directory, url, settle=0).build(chunk_size=64)
+        usernames, samples = InstaCluster.load_store(directory)
+        self.assertIsInstance(samples.base, np.memmap)
+        np.testing.assert_array_equal(samples, self.expected)
+        ratios = InstaCluster.load_store(directory, ["follower_ratio"])[1]
+        np.testing.assert_allclose(ratios[:, 0], self.expected[:, 1] / self.expected[:, 2])
+
+    def test_evaluate_model(self):
+        rng = np.random.default_rng(0)
+        samples = np.vstack([rng.normal(center, 1, (200, 7)) for center in (0, 10)])
+        json_path = os.path.join(self.directory.name, "evaluation.json")
+        png_path = os.path.join(self.directory.name, "evaluation.png")
+        evaluation = InstaCluster.evaluate_model(
+            samples, range(1, 4), json_path, png_path, show=False, processes=2
+        )
+        self.assertEqual([result["k"] for result in evaluation["results"]], [1, 2, 3])
+        self.assertIsNone(evaluation["results"][0]["silhouette"])
+        silhouettes = [result["silhouette"] for result in evaluation["results"][1:]]
+        self.assertEqual(max(silhouettes), silhouettes[0])
+        self.assertTrue(os.path.exists(json_path))
+        self.assertTrue(os.path.exists(png_path))
+        evaluation = InstaCluster.evaluate_model(
+            samples, [2], show=False, processes=1, minibatch_threshold=100
+        )
+        self.assertEqual(evaluation["method"], "MiniBatchKMeans")
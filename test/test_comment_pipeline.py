@@ -0,0 +1,58 @@
+import time
+import unittest
+from collections import namedtuple
+
+from InstaDataPackage.Comment_Pipeline import Comment_Pipeline
+
+Owner = namedtuple("Owner", "username")
+Comment = namedtuple("Comment", "owner")
+
+
+def comments(amount, owners=None):
+    for i in range(amount):
+        yield Comment(Owner(f"user_{i % (owners or amount)}"))
+
+
+class TestCommentPipeline(unittest.TestCase):
+    def setUp(self):
+        self.commits = []
+
+    def write(self, rows):
+        self.commits.append(list(rows))
+
+    def test_group_commit(self):
+        pipeline = Comment_Pipeline(
+            lambda owner: (owner.username,), self.write, workers=3, batch_size=10
+        )
+        stats = pipeline.run(comments(100, owners=40))
+        written = [row[0] for rows in self.commits for row in rows]
+        self.assertEqual(sorted(written), sorted(f"user_{i}" for i in range(40)))
+        self.assertTrue(all(len(rows) <= 10 for rows in self.commits))
+        self.assertEqual(stats["read"], 100)
+        self.assertEqual(stats["written"], 40)
+        self.assertFalse(stats["stopped"])
+        self.assertLessEqual(stats["fetch_depth"], 6)
+
+    def test_limit_and_select(self):
+        pipeline = Comment_Pipeline(
+            lambda owner: (owner.username,),
+            self.write,
+            select=lambda batch: [user for user in batch if user != "user_0"],
+        )
+        stats = pipeline.run(comments(1000), limit=5)
+        self.assertEqual(stats["queued"], 5)
+        self.assertEqual(stats["written"], 5)
+        self.assertNotIn(("user_0",), self.commits[0])
+
+    def test_stop_on(self):
+        def fetch(owner):
+            if owner.username == "user_3":
+                raise ConnectionError("blocked")
+            time.sleep(0.01)
+            return (owner.username,)
+
+        pipeline = Comment_Pipeline(fetch, self.write, workers=1, stop_on=(ConnectionError,))
+        stats = pipeline.run(comments(1000))
+        self.assertEqual(stats["failed"], 1)
+        self.assertTrue(stats["stopped"])
+        self.assertLess(stats["read"], 1000)
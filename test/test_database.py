@@ -1,24 +1,43 @@
+import os
+import tempfile
 import unittest
-from sqlite3 import Connection, ProgrammingError
+from sqlite3 import Connection
 
 from mysql.connector.connection import MySQLConnection
-from mysql.connector.errors import OperationalError
 
+from InstaDataPackage import Storage
 from InstaDataPackage.Instabase import DB_Session, DB_Session_Local
 
 
 class TestDBase(unittest.TestCase):
     def test_connection(self):
         with DB_Session() as db:
-            self.assertIsInstance(db._DB_Session__connection, MySQLConnection)
-        with self.assertRaises(OperationalError):
-            db._DB_Session__connection.cursor()
+            connection = db._DB_Session__connection
+            self.assertIsInstance(connection.dbapi_connection, MySQLConnection)
+        # Leaving the session returns the connection to the pool
+        self.assertIsNone(connection.dbapi_connection)
 
     def test_connection_local(self):
         with DB_Session_Local() as db:
-            self.assertIsInstance(db._DB_Session_Local__connection, Connection)
-        with self.assertRaises(ProgrammingError):
-            db._DB_Session_Local__connection.cursor()
+            connection = db._DB_Session_Local__connection
+            self.assertIsInstance(connection.dbapi_connection, Connection)
+        self.assertIsNone(connection.dbapi_connection)
+        self.assertEqual(Storage.pool_stats()[Storage.LOCAL_URL]["checked_out"], 0)
+
+    def test_sqlite_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            url = f"sqlite:///{os.path.join(directory, 'profile.db')}"
+            connection = Storage.connect(url)
+            cursor = connection.cursor()
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA auto_vacuum")
+            self.assertEqual(cursor.fetchone()[0], 2)
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], Storage.SQLITE_PROFILE["busy_timeout"])
+            cursor.close()
+            connection.close()
+            Storage.get_engine(url).dispose()
 
     def test_entries(self):
         with DB_Session() as db:
@@ -0,0 +1,26 @@
+import sqlite3
+
+from InstaDataPackage.Feature_Cache import Feature_Cache
+from .helpers import LocalDatabaseTest
+
+
+class TestFeatureCache(LocalDatabaseTest):
+    def setUp(self):
+        super().setUp()
+        self.insert([(f"user_{i}", i, i, i, 0, 0, 0, 0) for i in range(3)])
+
+    def test_stale(self):
+        cache = Feature_Cache(self.url, ttl=60)
+        self.assertEqual(cache.stale(["user_0", "new", "user_2"]), ["new"])
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_expired(self):
+        cache = Feature_Cache(self.url, ttl=-1)
+        self.assertEqual(cache.stale(["user_0", "user_1"]), ["user_0", "user_1"])
+        self.assertEqual(cache.prune(), 3)
+
+    def test_outlives_accounts(self):
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("DELETE FROM accounts")
+        self.assertEqual(Feature_Cache(self.url, ttl=60).stale(["user_1"]), [])
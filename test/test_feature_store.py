@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+
+from InstaDataPackage.Feature_Store import STORE_COLUMNS, Feature_Store, derive
+from .helpers import LocalDatabaseTest
+
+
+class TestFeatureStore(LocalDatabaseTest):
+    # Written before the feature cache existed
+    ROWS = [("old", 9, 0, 3, 1, 0, 0, 0)]
+
+    def setUp(self):
+        super().setUp()
+        self.store = Feature_Store(
+            os.path.join(self.directory.name, "store"), self.url, settle=0
+        )
+
+    def test_derive(self):
+        features = derive([[10, 200, 50, 0, 1, 0, 0], [0, 0, 0, 1, 0, 0, 1]])
+        self.assertEqual(features.shape, (2, len(STORE_COLUMNS)))
+        np.testing.assert_allclose(
+            features[0, 7:], [np.log(11), np.log(201), np.log(51), 4, 0.05]
+        )
+        np.testing.assert_allclose(features[1, 7:], [0, 0, 0, 0, 0])
+
+    def test_incremental(self):
+        self.insert([(f"user_{i}", i, i, i, 0, 0, 0, 0) for i in range(5)])
+        self.assertEqual(self.store.build(), 6)
+        self.assertEqual(self.store.build(), 0)
+        self.insert([("user_1", 100, 100, 1, 0, 0, 0, 0), ("new", 1, 1, 1, 0, 0, 0, 0)])
+        self.assertEqual(self.store.build(), 2)
+        self.assertEqual(self.store.stats()["partitions"], 2)
+        usernames, features = self.store.load()
+        expected = ["old", "new"] + [f"user_{i}" for i in range(5)]
+        self.assertEqual(sorted(usernames), sorted(expected))
+        latest = dict(zip(usernames, features[:, 0]))
+        self.assertEqual(latest["user_1"], 100)
+
+    def test_compact(self):
+        self.store.max_partitions = 2
+        for i in range(3):
+            self.insert([("same", i, i, i, 0, 0, 0, 0), (f"user_{i}", i, i, i, 0, 0, 0, 0)])
+            self.store.build()
+        self.assertEqual(self.store.stats()["partitions"], 1)
+        self.assertEqual(self.store.stats()["rows"], 5)
+        usernames, features = self.store.load(["posts", "followers"])
+        # A single partition is mapped, consecutive columns are a view of it
+        self.assertIsInstance(features.base, np.memmap)
+        self.assertEqual(dict(zip(usernames, features[:, 0]))["same"], 2)
+        self.assertEqual(len(os.listdir(self.store.directory)), 3)
+
+    def test_empty(self):
+        usernames, features = self.store.load(["follower_ratio"])
+        self.assertEqual(features.shape, (0, 1))
@@ -0,0 +1,94 @@
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from InstaDataPackage.Array_List import Array_List
+from InstaDataPackage.InstaData import Instabot
+from InstaDataPackage.Rate_Limit import Governor
+from InstaDataPackage.State_Store import State_Store
+
+
+class TestMonitorUsers(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.patches = [
+            mock.patch.object(
+                Instabot,
+                "_Instabot__STORE",
+                State_Store(f"sqlite:///{os.path.join(self.directory.name, 'bot_state.db')}"),
+            ),
+            mock.patch.object(
+                Instabot,
+                "_Instabot__GOVERNOR",
+                Governor(os.path.join(self.directory.name, "governor.json")),
+            ),
+            mock.patch.object(Instabot, "_Instabot__NOTIFICATION"),
+            mock.patch.object(Instabot, "_Instabot__FEATURE_STORE"),
+            mock.patch.object(Instabot, "_Instabot__FEATURES"),
+            mock.patch.object(Instabot, "_Instabot__SCORER"),
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.bot = Instabot.__new__(Instabot)
+        self.bot.users = Array_List(f"user_{i}" for i in range(12))
+        self.bot.watermarks = {}
+        self.bot.schedule = Instabot.new_schedule(self.bot.users)
+        self.bot.date_stamp = datetime(2020, 1, 1)
+        self.bot.cooldown = False
+        self.bot.stop_date = None
+        self.outcomes = {}
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most_running = 0
+        self.merged = []
+        self.bot.poll_user = self.poll_user
+        merge_result = self.bot.merge_result
+
+        def merged(result):
+            self.merged.append(result[0])
+            return merge_result(result)
+
+        self.bot.merge_result = merged
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.directory.cleanup()
+
+    def poll_user(self, user):
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        # The polls complete in a random order
+        time.sleep(random.uniform(0, 0.02))
+        with self.lock:
+            self.running -= 1
+        return user, self.outcomes.get(user, "no_post"), None
+
+    def test_merges_in_order(self):
+        self.bot.monitor_users(max_workers=4)
+        self.assertEqual(self.merged, list(self.bot.users))
+
+    def test_max_workers(self):
+        self.bot.monitor_users(max_workers=3)
+        self.assertGreater(self.most_running, 1)
+        self.assertLessEqual(self.most_running, 3)
+
+    def test_stops_pass(self):
+        for outcome in ("bad_request", "connection"):
+            with self.subTest(outcome):
+                self.merged.clear()
+                self.bot.schedule = Instabot.new_schedule(self.bot.users)
+                self.outcomes = {"user_4": outcome}
+                self.bot.monitor_users(max_workers=4)
+                self.assertEqual(self.merged, [f"user_{i}" for i in range(5)])
+                self.assertTrue(self.bot.cooldown)
+                # The users after the stop were not merged so they stay due
+                self.assertEqual(
+                    self.bot.schedule.due(time.time()), [f"user_{i}" for i in range(4, 12)]
+                )
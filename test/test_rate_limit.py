@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from InstaDataPackage.Rate_Limit import CircuitOpenError, Governor
+
+
+class TestGovernor(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "governor.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_bucket(self):
+        governor = Governor(self.filename, rate=0.001, capacity=2)
+        self.assertTrue(governor.acquire(timeout=0))
+        self.assertTrue(governor.acquire(timeout=0))
+        self.assertFalse(governor.acquire(timeout=0))
+
+    def test_breaker(self):
+        governor = Governor(
+            self.filename, base_delay=60, jitter=0, trip_on=(ConnectionError,)
+        )
+        with self.assertRaises(ConnectionError):
+            with governor.request():
+                raise ConnectionError("429")
+        self.assertTrue(governor.is_open("ConnectionError"))
+        with self.assertRaises(CircuitOpenError):
+            governor.acquire()
+
+    def test_paged(self):
+        governor = Governor(self.filename, rate=0.001, capacity=10)
+        # 25 items in pages of 10, the first page already paid for
+        self.assertEqual(list(governor.paged(range(25), 10)), list(range(25)))
+        self.assertAlmostEqual(governor.state()["tokens"], 8, places=1)
+        self.assertEqual(len(list(governor.paged(range(5), 10, charged=0))), 5)
+        self.assertAlmostEqual(governor.state()["tokens"], 7, places=1)
+
+    def test_paged_trips(self):
+        governor = Governor(self.filename, base_delay=60, trip_on=(ConnectionError,))
+
+        def pages():
+            yield from range(3)
+            raise ConnectionError("429")
+
+        with self.assertRaises(ConnectionError):
+            list(governor.paged(pages(), 3))
+        self.assertTrue(governor.is_open("ConnectionError"))
+        with self.assertRaises(CircuitOpenError):
+            list(governor.paged(range(10), 3, charged=0))
+
+    def test_probe(self):
+        governor = Governor(
+            self.filename, rate=100, base_delay=0, jitter=0, trip_on=(ConnectionError,)
+        )
+        governor.failure("ConnectionError")
+        # Only one request is let through while the breaker is half open
+        governor.acquire()
+        with self.assertRaises(CircuitOpenError):
+            governor.acquire()
+        governor.success()
+        self.assertEqual(governor.state()["breakers"], {})
+        governor.acquire()
+
+    def test_persistence(self):
+        governor = Governor(self.filename, base_delay=60)
+        delay = governor.failure("ConnectionError")
+        self.assertGreater(delay, 0)
+        restored = Governor(self.filename, base_delay=60)
+        self.assertTrue(restored.is_open("ConnectionError"))
+        self.assertEqual(
+            restored.state()["breakers"]["ConnectionError"]["failures"], 1
+        )
+        restored.reset()
+        self.assertFalse(Governor(self.filename).is_open())
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from InstaDataPackage.Scheduler import Scheduler
+from InstaDataPackage.State_Store import State_Store
+
+
+class StubBot:
+    def __init__(self):
+        self.passes = threading.Semaphore(0)
+
+    def monitor_users(self):
+        self.passes.release()
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = State_Store(
+            f"sqlite:///{os.path.join(self.directory.name, 'bot_state.db')}"
+        )
+        self.bot = StubBot()
+        self.loads = 0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def load_bot(self):
+        self.loads += 1
+        return self.bot
+
+    def scheduler(self) -> Scheduler:
+        return Scheduler(self.load_bot, interval=0.01, store=self.store)
+
+    def test_start_stop(self):
+        scheduler = self.scheduler()
+        self.assertTrue(scheduler.start())
+        self.assertFalse(scheduler.start())
+        self.assertTrue(self.bot.passes.acquire(timeout=5))
+        self.assertTrue(self.bot.passes.acquire(timeout=5))
+        scheduler.stop(timeout=5)
+        self.assertFalse(scheduler.is_running())
+        self.assertGreaterEqual(scheduler.passes, 2)
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(self.store.setting("scheduler"), "stopped")
+
+    def test_pause_resume(self):
+        scheduler = self.scheduler()
+        scheduler.start(paused=True)
+        self.assertTrue(scheduler.is_paused())
+        self.assertFalse(self.bot.passes.acquire(timeout=0.1))
+        self.assertEqual(self.store.setting("scheduler"), "paused")
+        scheduler.resume()
+        self.assertTrue(self.bot.passes.acquire(timeout=5))
+        self.assertEqual(self.store.setting("scheduler"), "running")
+        scheduler.stop(timeout=5)
+
+    def test_restore(self):
+        self.assertFalse(self.scheduler().restore())
+        scheduler = self.scheduler()
+        scheduler.start()
+        scheduler.pause()
+        # The process exiting leaves the scheduler to be restored
+        scheduler.stop(timeout=5, save=False)
+        restored = self.scheduler()
+        self.assertTrue(restored.restore())
+        self.assertTrue(restored.is_running())
+        self.assertTrue(restored.is_paused())
+        restored.stop(timeout=5)
+        self.assertFalse(self.scheduler().restore())
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from InstaDataPackage.Bloom_Filter import Bloom_Filter
+from InstaDataPackage.InstaData import Instabot
+from InstaDataPackage.Instabase import DB_Session, DB_Session_Local
+from .helpers import create_accounts
+
+
+class TestSeen(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "seen.bloom")
+        local = create_accounts(
+            os.path.join(self.directory.name, "instabase.db"),
+            rows=[("local_0", 1, 1, 1, 0, 0, 0, 0)],
+        )
+        server = create_accounts(
+            os.path.join(self.directory.name, "server.db"),
+            "insta_train",
+            [(f"server_{i}", 1, 1, 1, 0, 0, 0, 0) for i in range(20)],
+        )
+        # A filter filled up by accounts since moved to the server
+        full = Bloom_Filter(2)
+        full.update(["server_0", "server_1"])
+        full.save(self.filename)
+        self.patches = [
+            mock.patch.object(Instabot, "_Instabot__SEEN", None),
+            mock.patch.object(Instabot, "_Instabot__SEEN_FILE", self.filename),
+            mock.patch.object(Instabot, "_Instabot__SEEN_CAPACITY", 4),
+            mock.patch(
+                "InstaDataPackage.InstaData.DB_Session_Local", lambda: DB_Session_Local(local)
+            ),
+            mock.patch("InstaDataPackage.InstaData.DB_Session", lambda: DB_Session(server)),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.directory.cleanup()
+
+    def test_reseed_from_server(self):
+        seen = Instabot.seen()
+        self.assertFalse(seen.is_full())
+        self.assertGreaterEqual(seen.capacity, 40)
+        for user in ["local_0"] + [f"server_{i}" for i in range(20)]:
+            self.assertIn(user, seen)
+        self.assertEqual(Bloom_Filter.load(self.filename).count, seen.count)
+
+    def test_server_unavailable(self):
+        with mock.patch(
+            "InstaDataPackage.InstaData.DB_Session", side_effect=ConnectionError("down")
+        ):
+            seen = Instabot.seen()
+        self.assertIn("local_0", seen)
+        self.assertEqual(seen.capacity, 4)
@@ -0,0 +1,68 @@
+from InstaDataPackage.Instabase import DB_Session_Local, DB_Session_Sheets
+from .helpers import LocalDatabaseTest
+
+
+class FakeWorksheet:
+    """Stands in for a gspread worksheet, fails every call after the given amount and runs
+    on_append after every call that succeeds
+    """
+
+    def __init__(self, fail_after=None, on_append=None):
+        self.rows = []
+        self.calls = 0
+        self.fail_after = fail_after
+        self.on_append = on_append
+
+    def append_rows(self, values):
+        if self.fail_after is not None and self.calls >= self.fail_after:
+            raise ConnectionError("Sheets API unavailable")
+        self.calls += 1
+        self.rows.extend(values)
+        if self.on_append:
+            self.on_append()
+
+    def get_all_values(self):
+        return self.rows
+
+
+class TestSheets(LocalDatabaseTest):
+    def setUp(self):
+        super().setUp()
+        self.rows = [(f"user_{i}", i, i, i, 0, 1, 0, 1) for i in range(10)]
+        self.insert(self.rows)
+
+    def test_batches(self):
+        worksheet = FakeWorksheet()
+        with DB_Session_Local(self.url) as db:
+            exported = db.transfer_to_sheet(DB_Session_Sheets(worksheet), chunk_size=3)
+            self.assertEqual(db.show(), [])
+        self.assertEqual(exported, 10)
+        self.assertEqual(worksheet.calls, 4)
+        self.assertEqual([tuple(row) for row in worksheet.rows], self.rows)
+
+    def test_resume(self):
+        failing = FakeWorksheet(fail_after=2)
+        with DB_Session_Local(self.url) as db:
+            with self.assertRaises(ConnectionError):
+                db.transfer_to_sheet(DB_Session_Sheets(failing), chunk_size=3)
+            # Only the rows of confirmed chunks are deleted
+            self.assertEqual(len(db.show()), 4)
+            worksheet = FakeWorksheet()
+            self.assertEqual(db.transfer_to_sheet(DB_Session_Sheets(worksheet)), 4)
+        exported = [tuple(row) for row in failing.rows + worksheet.rows]
+        self.assertEqual(exported, self.rows)
+
+    def test_written_during_append(self):
+        updated = ("user_1", 100, 1, 1, 0, 1, 0, 1)
+
+        def rescrape():
+            if worksheet.calls == 1:
+                self.insert([updated])
+
+        worksheet = FakeWorksheet(on_append=rescrape)
+        with DB_Session_Local(self.url) as db:
+            exported = db.transfer_to_sheet(DB_Session_Sheets(worksheet), chunk_size=3)
+            self.assertEqual(db.show(), [])
+        # The row written after its chunk was read is exported again, not deleted
+        self.assertEqual(exported, 11)
+        self.assertEqual([tuple(row) for row in worksheet.rows][3], updated)
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from InstaDataPackage.State_Store import State_Store
+
+
+class TestStateStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{os.path.join(self.directory.name, 'bot_state.db')}"
+        self.values = {
+            "date_stamp": datetime(2020, 5, 1, 12, 30),
+            "cooldown": False,
+            "stop_date": None,
+        }
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_empty(self):
+        self.assertIsNone(State_Store(self.url).load())
+
+    def test_round_trip(self):
+        watermarks = {"b": datetime(2020, 4, 1)}
+        State_Store(self.url).save(self.values, ["a", "b"], watermarks)
+        state = State_Store(self.url).load()
+        self.assertEqual(state["values"], self.values)
+        self.assertEqual(state["followees"], [("a", None), ("b", datetime(2020, 4, 1))])
+
+    def test_only_changes_written(self):
+        store = State_Store(self.url)
+        users = [f"user_{i}" for i in range(100)]
+        self.assertEqual(store.save(self.values, users, {}), 103)
+        self.assertEqual(store.save(self.values, users, {}), 0)
+        self.values["cooldown"] = True
+        self.assertEqual(
+            store.save(self.values, users[:-1], {"user_3": datetime(2021, 1, 1)}), 3
+        )
+        state = State_Store(self.url).load()
+        self.assertTrue(state["values"]["cooldown"])
+        self.assertEqual(len(state["followees"]), 99)
+        self.assertEqual(state["followees"][3], ("user_3", datetime(2021, 1, 1)))
+
+    def test_schedule(self):
+        store = State_Store(self.url)
+        store.save(self.values, ["a", "b"], {}, {"a": (3600.0, 100.0)})
+        self.assertEqual(store.save(self.values, ["a", "b"], {}, {"a": (3600.0, 100.0)}), 0)
+        self.assertEqual(store.save(self.values, ["a", "b"], {}, {"a": (3600.0, 200.0)}), 1)
+        self.assertEqual(State_Store(self.url).load()["schedule"], {"a": (3600.0, 200.0)})
@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+
+from App_Package.app import StatusCache
+
+
+class TestStatusCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "bot_state.db")
+        open(self.filename, "w").close()
+        os.utime(self.filename, ns=(1, 1))
+        self.cache = StatusCache(f"sqlite:///{self.filename}")
+        self.builds = 0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def build(self) -> dict:
+        self.builds += 1
+        return {"builds": self.builds}
+
+    def test_reuses_status(self):
+        status = self.cache.get(self.build)
+        self.assertIs(self.cache.get(self.build), status)
+        self.assertEqual(self.builds, 1)
+
+    def test_invalidate(self):
+        self.cache.get(self.build)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.get(self.build), {"builds": 2})
+        self.assertEqual(self.cache.get(self.build), {"builds": 2})
+
+    def test_state_saved(self):
+        self.cache.get(self.build)
+        os.utime(self.filename, ns=(2, 2))
+        self.assertEqual(self.cache.get(self.build), {"builds": 2})
+        # A write ahead log appearing is a save as well
+        open(f"{self.filename}-wal", "w").close()
+        self.assertEqual(self.cache.get(self.build), {"builds": 3})
+        self.assertEqual(self.builds, 3)
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from instaloader.exceptions import ConnectionException
+
+from InstaDataPackage.Array_List import Array_List
+from InstaDataPackage.InstaData import Instabot
+from InstaDataPackage.Rate_Limit import Governor
+from InstaDataPackage.State_Store import State_Store
+
+
+class FakeProfile:
+    def __init__(self, username, requests):
+        self.username = username
+        self.requests = requests
+
+    def get_posts(self):
+        self.requests.append(self.username)
+        yield mock.Mock(date_utc=datetime(2020, 1, int(self.username.split("_")[1]) + 1))
+
+
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.requests = []
+        self.store = State_Store(
+            f"sqlite:///{os.path.join(self.directory.name, 'bot_state.db')}"
+        )
+        self.patches = [
+            mock.patch.object(Instabot, "_Instabot__STORE", self.store),
+            mock.patch.object(
+                Instabot,
+                "_Instabot__GOVERNOR",
+                Governor(os.path.join(self.directory.name, "governor.json"), capacity=1000),
+            ),
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.bot = Instabot.__new__(Instabot)
+        self.bot._Instabot__I_session = mock.Mock()
+        self.bot.users = Array_List()
+        self.bot.watermarks = {}
+        self.bot.schedule = Instabot.new_schedule()
+        self.bot.date_stamp = datetime(2019, 1, 1)
+        self.bot.cooldown = False
+        self.bot.stop_date = None
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.directory.cleanup()
+
+    def sync(self, usernames):
+        followees = [FakeProfile(username, self.requests) for username in usernames]
+        with mock.patch(
+            "InstaDataPackage.InstaData.Profile.from_username",
+            return_value=mock.Mock(get_followees=lambda: iter(followees)),
+        ):
+            self.bot.add_users(chunk_size=2)
+
+    def test_only_new_followees_fetched(self):
+        self.sync([f"user_{i}" for i in range(5)])
+        self.assertEqual(len(self.requests), 5)
+        self.requests.clear()
+        self.sync(["user_0", "user_2", "user_3", "user_4", "user_9"])
+        self.assertEqual(self.requests, ["user_9"])
+        self.assertEqual(
+            list(self.bot.users), ["user_0", "user_2", "user_3", "user_4", "user_9"]
+        )
+        self.assertNotIn("user_1", self.bot.watermarks)
+        self.assertNotIn("user_1", self.bot.schedule)
+        self.assertEqual(self.bot.date_stamp, datetime(2020, 1, 10))
+        saved = [user for user, _ in self.store.load()["followees"]]
+        self.assertEqual(saved, list(self.bot.users))
+
+    def test_followee_pages_charged(self):
+        governor = Instabot.governor()
+        self.sync([f"user_{i}" for i in range(30)])
+        # The profile and first page, two more pages of 12 and the latest post of each followee
+        spent = governor.capacity - governor.state()["tokens"]
+        self.assertAlmostEqual(spent, 2 + 2 + 30, delta=0.5)
+
+    def test_followee_page_trips_breaker(self):
+        def followees():
+            yield from (FakeProfile(f"user_{i}", self.requests) for i in range(12))
+            raise ConnectionException("429")
+
+        governor = Governor(
+            os.path.join(self.directory.name, "tripping.json"), trip_on=(ConnectionException,)
+        )
+        with mock.patch.object(Instabot, "_Instabot__GOVERNOR", governor), mock.patch(
+            "InstaDataPackage.InstaData.Profile.from_username",
+            return_value=mock.Mock(get_followees=followees),
+        ):
+            with self.assertRaises(ConnectionException):
+                self.bot.add_users()
+        self.assertTrue(governor.is_open("ConnectionException"))
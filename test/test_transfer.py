@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from InstaDataPackage.Instabase import DB_Session, DB_Session_Local, _upsert
+from .helpers import create_accounts
+
+
+class TestTransfer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.local = os.path.join(self.directory.name, "instabase.db")
+        self.server = os.path.join(self.directory.name, "server.db")
+        create_accounts(self.local)
+        create_accounts(self.server, "insta_train", [("user_0", 0, 0, 0, 0, 0, 0, 0)])
+        self.rows = [(f"user_{i}", i, i + 1, i + 2, 1, 0, 1, 0) for i in range(25)]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_insert_many(self):
+        with DB_Session_Local(f"sqlite:///{self.local}") as db:
+            db.insert_many(self.rows)
+            db.insert(("user_1", 9, 9, 9, 0, 0, 0, 1))
+            entries = db.show()
+        self.assertEqual(len(entries), 25)
+        self.assertIn(("user_1", 9, 9, 9, 0, 0, 0, 1), entries)
+
+    def test_upsert(self):
+        for session in (
+            DB_Session_Local(f"sqlite:///{self.local}"),
+            DB_Session(f"sqlite:///{self.server}"),
+        ):
+            with self.subTest(type(session).__name__), session as db:
+                db.insert(("user_0", 1, 1, 1, 0, 0, 0, 0))
+                db.insert_many([("user_0", 5, 6, 7, 1, 1, 1, 1)])
+                self.assertEqual(db.show(), [("user_0", 5, 6, 7, 1, 1, 1, 1)])
+
+    def test_binds_quotes(self):
+        rows = [
+            ("o'brien", 1, 1, 1, 0, 0, 0, 0),
+            ('say "hi"', 2, 2, 2, 0, 0, 0, 0),
+            ("x'); DROP TABLE accounts; --", 3, 3, 3, 0, 0, 0, 0),
+        ]
+        with DB_Session_Local(f"sqlite:///{self.local}") as db:
+            self.assertEqual(db.insert_many(rows), 3)
+            self.assertEqual(sorted(db.show()), sorted(rows))
+            self.assertEqual(db.lookup(["o'brien"]), [rows[0]])
+
+    def test_batch_is_one_transaction(self):
+        with DB_Session_Local(f"sqlite:///{self.local}") as db:
+            db.insert(("user_0", 1, 1, 1, 0, 0, 0, 0))
+            # The last row cannot be bound so the rows before it are rolled back too
+            with self.assertRaises(sqlite3.ProgrammingError):
+                db.insert_many(self.rows[:5] + [("user_99", 1)])
+            self.assertEqual(db.show(), [("user_0", 1, 1, 1, 0, 0, 0, 0)])
+            self.assertEqual(db.fresh([row[0] for row in self.rows[:5]], 0), {"user_0"})
+        with DB_Session(f"sqlite:///{self.server}") as db:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                db.insert_many(self.rows[1:5] + [("user_99", 1)])
+            self.assertEqual(db.size(), 1)
+
+    def test_upsert_sql(self):
+        self.assertEqual(
+            _upsert("sqlite", "accounts", ["username", "posts"]),
+            "INSERT INTO accounts(username, posts) VALUES(?,?) "
+            "ON CONFLICT(username) DO UPDATE SET posts=excluded.posts",
+        )
+        self.assertEqual(
+            _upsert("mysql", "insta_train", ["username", "posts"], keep=["posts"]),
+            "INSERT INTO insta_train(username, posts) VALUES(%s,%s) "
+            "ON DUPLICATE KEY UPDATE posts=COALESCE(VALUES(posts), posts)",
+        )
+
+    def test_transfer_to_server(self):
+        with DB_Session_Local(f"sqlite:///{self.local}") as db:
+            db.insert_many(self.rows)
+            rows, rate = db.transfer_to_server(
+                chunk_size=7, server=DB_Session(f"sqlite:///{self.server}")
+            )
+            self.assertEqual(db.show(), [])
+        self.assertEqual(rows, 25)
+        self.assertGreater(rate, 0)
+        with DB_Session(f"sqlite:///{self.server}") as db:
+            self.assertEqual(db.size(), 25)
+            self.assertEqual(sorted(db.show()), sorted(self.rows))
+
+    def test_query(self):
+        with DB_Session(f"sqlite:///{self.server}") as db:
+            db.insert_many(self.rows)
+            df = db.query(["user_3", "missing", "user_4"])
+            found = db.query_found(["user_3", "missing"])
+        self.assertEqual(list(df["User"]), ["user_3", "missing", "user_4"])
+        self.assertEqual(df.loc[0, "Followers"], 4)
+        self.assertTrue(df["Posts"].isna()[1])
+        self.assertEqual(list(found["Found"]), [True, False])